@@ -33,10 +33,18 @@ from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 from datetime import datetime
 import time
+import sys
 from dataclasses import dataclass, asdict
+from pathlib import Path
 from typing import List, Dict, Tuple
 import json
 
+# Shared bit utilities (uint64 XOR + popcount) from the Phase 3 simulations
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'phase3-quantum-communication'
+                       / '06-simulations' / 'utils'))
+
+from qc_utils import count_bit_errors
+
 # Use custom quantum backend
 QUANTUM_BACKEND = "Custom"
 print("Using custom quantum simulation backend")
@@ -402,9 +410,10 @@ class QuantumTemporalAuthentication:
         
         # 2. Calculate QBER
         if len(sifted_alice) > 0:
-            errors = sum(1 for a, b in zip(sifted_alice, sifted_bob) if a != b)
+            errors = count_bit_errors(sifted_alice, sifted_bob)
             qber = errors / len(sifted_alice)
         else:
+            errors = 0
             qber = 1.0
         
         # 3. Calculate timing statistics
@@ -464,7 +473,7 @@ class QuantumTemporalAuthentication:
             'detection_ok': detection_ok,
             'sifted_key_length': len(sifted_alice),
             'secure_key_rate_bits': key_rate,
-            'errors': sum(1 for a, b in zip(sifted_alice, sifted_bob) if a != b) if sifted_alice else 0,
+            'errors': errors,
             'total_bits_compared': len(sifted_alice)
         }
     
@@ -7,6 +7,7 @@ Qiskit backend for quantum circuit simulation
 import dash
 from dash import dcc, html, Input, Output, State, callback_context
 import plotly.graph_objs as go
+import plotly.io as pio
 import numpy as np
 from qiskit import QuantumCircuit, transpile
 from qiskit_aer import AerSimulator
@@ -14,6 +15,14 @@ import threading
 import time
 from collections import deque
 
+# Dash serializes every figure through Plotly's JSON encoder on each interval
+# tick; orjson encodes the numpy history arrays natively and much faster
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    pass  # Plotly falls back to the standard library json engine
+
 # Initialize Dash app
 app = dash.Dash(__name__,
                 meta_tags=[{'name': 'viewport', 'content': 'width=device-width, initial-scale=1.0'}])
@@ -60,6 +69,14 @@ class SimulationState:
 
 sim_state = SimulationState()
 
+# Shared Aer backend, built once at import instead of on every Start click.
+# The frame circuit only uses X, H and measurements, all Clifford, so the
+# stabilizer method simulates it in O(N^2) rather than the 2^N amplitudes a
+# statevector needs (which makes the 50-qubit slider setting infeasible).
+# Frames are small, so a single thread beats OpenMP: launching the worker
+# threads costs more than the simulation kernels themselves.
+SIM = AerSimulator(method='stabilizer', max_parallel_threads=1, max_parallel_experiments=0)
+
 # App layout
 app.layout = html.Div([
     # Header
@@ -136,9 +153,21 @@ app.layout = html.Div([
     ], style={'width': '68%', 'display': 'inline-block', 'verticalAlign': 'top', 'padding': '10px'}),
 
     # Interval for updating data
-    dcc.Interval(id='interval-component', interval=200, n_intervals=0)  # Update every 200ms
+    dcc.Interval(id='interval-component', interval=200, n_intervals=0),  # Update every 200ms
+    dcc.Interval(id='slow-interval', interval=1000, n_intervals=0)  # Detailed stats every 1s
 ])
 
+def pack_bits(bits):
+    """Pack a 0/1 array into an int bitmask (qubit i -> bit i)"""
+    packed = np.packbits(np.asarray(bits, dtype=np.uint8), bitorder='little')
+    return int.from_bytes(packed.tobytes(), 'little')
+
+def apply_gate(gate, mask):
+    """Apply a single-qubit gate to every qubit set in mask with one call"""
+    qubits = np.flatnonzero(mask).tolist()
+    if qubits:  # Qiskit rejects empty qubit lists
+        gate(qubits)
+
 # Simulation thread
 class QTASimulationThread(threading.Thread):
     def __init__(self, frames, qubits_per_frame, eve_prob, state):
@@ -147,12 +176,15 @@ class QTASimulationThread(threading.Thread):
         self.qubits_per_frame = qubits_per_frame
         self.eve_prob = eve_prob
         self.state = state
-        self.simulator = AerSimulator()  # Use the Aer Simulator
+        self.simulator = SIM  # Shared module-level Aer Simulator
+        self.rng = np.random.default_rng()  # One PCG64 generator per run
         self.daemon = True
 
     def run(self):
         print(f"Starting simulation: {self.frames} frames, {self.qubits_per_frame} qubits/frame")
         self.state.running = True
+        frame_period = 0.05  # Simulate real-time (50ms per frame)
+        next_deadline = time.monotonic()
 
         for frame in range(self.frames):
             if not self.state.running:
@@ -169,79 +201,81 @@ class QTASimulationThread(threading.Thread):
             if (frame + 1) % 10 == 0:
                 print(f"Frame {frame + 1}/{self.frames} completed")
 
-            time.sleep(0.05)  # Simulate real-time (50ms per frame)
+            # Sleep only for what is left of this frame's budget, so slow
+            # frames are caught up instead of always adding another 50ms
+            next_deadline += frame_period
+            sleep_for = next_deadline - time.monotonic()
+            if sleep_for > 0:
+                time.sleep(sleep_for)
 
         self.state.running = False
         print("Simulation completed")
 
     def simulate_frame(self):
         """Simulate one QTA frame using Qiskit"""
-        # Alice's preparation
-        alice_bases = np.random.choice([0, 1], self.qubits_per_frame)  # 0=Z, 1=X
-        alice_bits = np.random.choice([0, 1], self.qubits_per_frame)
-
-        # Create quantum circuit
-        qc = QuantumCircuit(self.qubits_per_frame, self.qubits_per_frame)
+        n = self.qubits_per_frame
+
+        # Draw all of the frame's randomness up front
+        # Rows: Alice's bases (0=Z, 1=X), Alice's bits, Bob's bases, Eve's bases
+        alice_bases, alice_bits, bob_bases, eve_bases = self.rng.integers(0, 2, size=(4, n))
+        # Rows: Eve's intercept decision, Eve's resend error decision
+        intercept_draws, flip_draws = self.rng.random(size=(2, n))
+
+        # Eve's per-qubit decisions, computed for the whole frame at once
+        intercepted = intercept_draws < self.eve_prob
+        eve_intercepts = int(np.count_nonzero(intercepted))
+        eve_x_basis = intercepted & (eve_bases == 1)
+        # Eve resends (introduces errors if wrong basis) - 50% error rate
+        eve_flips = intercepted & (eve_bases != alice_bases) & (flip_draws < 0.5)
+
+        # Create quantum circuit; gates on distinct qubits commute, so each
+        # layer is appended with a single multi-qubit call
+        qc = QuantumCircuit(n, n)
+        all_qubits = list(range(n))
 
         # Prepare qubits
-        for i in range(self.qubits_per_frame):
-            if alice_bits[i] == 1:
-                qc.x(i)
-            if alice_bases[i] == 1:  # X basis
-                qc.h(i)
-
-        # Eve's attack
-        eve_intercepts = 0
-        for i in range(self.qubits_per_frame):
-            if np.random.random() < self.eve_prob:
-                eve_intercepts += 1
-                # Eve measures in random basis
-                eve_basis = np.random.randint(0, 2)
-                if eve_basis == 1: # If X basis, apply Hadamard before measurement
-                    qc.h(i)
-                qc.measure(i, i) # Mid-circuit measurement
-                # Eve resends (introduces errors if wrong basis)
-                if eve_basis != alice_bases[i]:
-                    # Wrong basis - 50% error rate
-                    if np.random.random() < 0.5:
-                        qc.x(i)
-                if eve_basis == 1: # Restore Hadamard if measured in X
-                    qc.h(i)
+        apply_gate(qc.x, alice_bits)
+        apply_gate(qc.h, alice_bases)  # X basis
+
+        # Eve's attack: measure in her random basis, mid-circuit
+        if eve_intercepts:
+            eve_idx = np.flatnonzero(intercepted).tolist()
+            apply_gate(qc.h, eve_x_basis)  # If X basis, apply Hadamard before measurement
+            qc.measure(eve_idx, eve_idx)
+            apply_gate(qc.x, eve_flips)
+            apply_gate(qc.h, eve_x_basis)  # Restore Hadamard if measured in X
 
         # Bob's measurement
-        bob_bases = np.random.choice([0, 1], self.qubits_per_frame)
-        for i in range(self.qubits_per_frame):
-            if bob_bases[i] == 1: # If X basis, apply Hadamard before measurement
-                qc.h(i)
-            qc.measure(i, i) # Final measurement
+        apply_gate(qc.h, bob_bases)  # If X basis, apply Hadamard before measurement
+        qc.measure(all_qubits, all_qubits)  # Final measurement
 
         # Execute circuit
         qc_transpiled = transpile(qc, self.simulator)  # Use the Aer Simulator
-        job = self.simulator.run(qc_transpiled, shots=1)
+        job = self.simulator.run(qc_transpiled, shots=1, memory=True)
         result = job.result()
-        # Retrieve counts from the result object
-        counts = result.get_counts()
-
-        # The result from QasmSimulator.run().result().get_counts() is a dictionary
-        # like {'001': 1}, where keys are bitstrings. We need to convert it to a list of ints.
-        # Since shots=1, there will be only one key in counts.
-        measurement_bitstring = list(counts.keys())[0]
-        bob_results = [int(b) for b in measurement_bitstring[::-1]] # Qiskit bitstring is little-endian
-
-        # Calculate QBER (only on matched bases)
-        matched_indices = [i for i in range(self.qubits_per_frame)
-                          if alice_bases[i] == bob_bases[i]]
-
-        if matched_indices:
-            errors = sum(1 for i in matched_indices
-                        if alice_bits[i] != bob_results[i])
-            qber = errors / len(matched_indices)
+
+        # With memory=True the single shot comes back directly as a bitstring
+        # like '001', skipping the counts dictionary. Decode the ASCII '0'/'1'
+        # bytes to a uint8 array in one step.
+        measurement_bitstring = result.get_memory()[0]
+        bob_results = np.frombuffer(measurement_bitstring.encode('ascii'),
+                                    dtype=np.uint8)[::-1] - 48  # Qiskit bitstring is little-endian
+
+        # Calculate QBER (only on matched bases) on packed bitmasks:
+        # one XOR/AND per frame and a popcount instead of a per-qubit loop
+        frame_mask = (1 << n) - 1
+        matched = ~(pack_bits(alice_bases) ^ pack_bits(bob_bases)) & frame_mask
+        matched_count = matched.bit_count()
+
+        if matched_count:
+            errors = ((pack_bits(alice_bits) ^ pack_bits(bob_results)) & matched).bit_count()
+            qber = errors / matched_count
         else:
             qber = 0.5  # No matched bases means high error or undefined
 
         # Timing simulation
         base_delay = 5.0  # ns
-        timing_jitter = np.random.normal(0, 0.05)  # Small jitter
+        timing_jitter = self.rng.normal(0, 0.05)  # Small jitter
         eve_delay = eve_intercepts * 0.5 if eve_intercepts > 0 else 0
         total_delay = base_delay + timing_jitter + eve_delay
 
@@ -331,20 +365,20 @@ def control_simulation(start_clicks, reset_clicks, frames, qubits, eve_prob):
 @app.callback(
     [Output('qber-graph', 'figure'),
      Output('timing-graph', 'figure'),
-     Output('stats-display', 'children'),
-     Output('detailed-stats', 'children')],
+     Output('stats-display', 'children')],
     Input('interval-component', 'n_intervals')
 )
 def update_all_displays(n):
     data = sim_state.get_data()
+    frames_x = np.arange(len(data['qber_history']))
 
     # QBER Graph
     if data['qber_history']:
         qber_fig = {
             'data': [
                 go.Scatter(
-                    x=list(range(len(data['qber_history']))),
-                    y=data['qber_history'],
+                    x=frames_x,
+                    y=np.asarray(data['qber_history']),
                     mode='lines+markers',
                     name='QBER',
                     line={'color': '#3498db', 'width': 2},
@@ -386,8 +420,8 @@ def update_all_displays(n):
         timing_fig = {
             'data': [
                 go.Scatter(
-                    x=list(range(len(data['delay_history']))),
-                    y=data['delay_history'],
+                    x=frames_x,
+                    y=np.asarray(data['delay_history']),
                     mode='lines+markers',
                     name='Delay',
                     line={'color': '#9b59b6', 'width': 2},
@@ -464,8 +498,26 @@ def update_all_displays(n):
                          style={'fontSize': '14px', 'color': '#e74c3c' if total_eve > 0 else '#2ecc71'})
             ])
         ])
+    else:
+        stats_html = html.Div("Click 'Start Simulation' to begin")
+
+    return qber_fig, timing_fig, stats_html
+
+# Callback for the detailed statistics tab, refreshed on the slow interval
+# since nobody reads a dozen formatted numbers faster than once a second
+@app.callback(
+    Output('detailed-stats', 'children'),
+    Input('slow-interval', 'n_intervals')
+)
+def update_detailed_stats(n):
+    data = sim_state.get_data()
+
+    if data['frame'] > 0:
+        success_rate = sum(data['auth_history']) / len(data['auth_history']) * 100
+        avg_qber = np.mean(data['qber_history'])
+        avg_delay = np.mean(data['delay_history'])
+        total_eve = sum(data['eve_intercepts'])
 
-        # Detailed stats
         detailed_html = html.Div([
             html.H4("Detailed Statistics", style={'color': '#2c3e50'}),
             html.Div([
@@ -487,10 +539,9 @@ def update_all_displays(n):
             ], style={'lineHeight': '1.8'})
         ])
     else:
-        stats_html = html.Div("Click 'Start Simulation' to begin")
         detailed_html = html.Div("No data available yet")
 
-    return qber_fig, timing_fig, stats_html, detailed_html
+    return detailed_html
 
 # Run the app
 if __name__ == '__main__':
@@ -0,0 +1,33 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Compiled binary entropy / secure key rate kernels for analysis.py
+=================================================================
+
+Optional Cython build of the PerformanceMetrics hot paths. analysis.py uses
+these when the extension is importable and falls back to Numba/NumPy
+otherwise. Build in place from this directory with:
+
+    CFLAGS="-O3 -ffast-math" cythonize -i -3 _entropy.pyx
+"""
+
+from libc.math cimport log2
+
+
+cpdef double binary_entropy(double x) noexcept nogil:
+    """Binary entropy H(x), 0 outside the open interval (0, 1)."""
+    if x <= 0.0 or x >= 1.0:
+        return 0.0
+    return -x * log2(x) - (1.0 - x) * log2(1.0 - x)
+
+
+cpdef void binary_entropy_vec(const double[::1] x, double[::1] out) noexcept nogil:
+    """Element-wise binary entropy of x written into out (same length)."""
+    cdef Py_ssize_t i
+    for i in range(x.shape[0]):
+        out[i] = binary_entropy(x[i])
+
+
+cpdef double secure_key_rate(double sifted_key_rate, double h_qber) noexcept nogil:
+    """GLLP secure key rate sifted_key_rate * (1 - 2*H(QBER)), clipped at 0."""
+    cdef double rate = sifted_key_rate * (1.0 - 2.0 * h_qber)
+    return rate if rate > 0.0 else 0.0
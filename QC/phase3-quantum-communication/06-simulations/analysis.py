@@ -30,121 +30,246 @@ Date: 2026
 
 import numpy as np
 import json
-from typing import Dict, List, Tuple, Any
+import math
+import sys
+from typing import Dict, List, Tuple, Any, Union
 from pathlib import Path
 import logging
 
+# Add utils to path
+sys.path.insert(0, str(Path(__file__).parent / 'utils'))
+
+from numpy.lib import recfunctions as rfn
+
+from qc_utils import StatisticsUtils, SimulationDataManager, TRIAL_DTYPE
+
 logger = logging.getLogger(__name__)
 
+# Section rule used by the text reports
+REPORT_RULE = "=" * 60
+
+# Optional fast JSON encoder with native NumPy support
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional Numba JIT for the scalar entropy/key-rate kernels
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback no-op decorator when Numba is not installed."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+# Optional compiled Cython kernels (build _entropy.pyx in place to enable)
+try:
+    import _entropy
+    CYTHON_ENTROPY_AVAILABLE = True
+except ImportError:
+    CYTHON_ENTROPY_AVAILABLE = False
+
+
+@njit(cache=True, fastmath=True)
+def _binary_entropy_scalar(x):
+    """Scalar binary entropy kernel, 0 outside the open interval (0, 1)."""
+    if x <= 0.0 or x >= 1.0:
+        return 0.0
+    return -x * math.log2(x) - (1.0 - x) * math.log2(1.0 - x)
+
+
+@njit(cache=True, fastmath=True)
+def _secure_key_rate_scalar(sifted_key_rate, h_qber):
+    """Scalar GLLP secure key rate kernel, clipped at 0."""
+    return max(0.0, sifted_key_rate * (1.0 - 2.0 * h_qber))
+
 
 class SimulationAnalyzer:
     """Analyzes BB84 protocol simulation results."""
     
-    def __init__(self):
+    # Trial record fields summarized by compute_statistics: (field, statistics key)
+    METRIC_COLUMNS = [
+        ('qber', 'qber'),
+        ('sift', 'sifted_key'),
+        ('final', 'final_key'),
+        ('rate', 'key_rate'),
+    ]
+    
+    # Result dict keys rebuilt by to_dict_list for trials that only exist as records
+    RESULT_KEYS = [
+        ('qber', 'qber'),
+        ('sift', 'sifted_key_length'),
+        ('final', 'final_key_length'),
+        ('rate', 'key_rate'),
+    ]
+    
+    def __init__(self, initial_capacity: int = 64):
         self.results = []
         self.statistics = {}
+        # Structured TRIAL_DTYPE buffer with one record per trial, doubled on overflow
+        self._records = np.empty(initial_capacity, dtype=TRIAL_DTYPE)
+        self._num_trials = 0
+        # Leading trials ingested via from_structured, which have no result dict
+        self._record_only_trials = 0
+        # Set when trials arrive, cleared once statistics are recomputed
+        self._dirty = True
+    
+    @classmethod
+    def from_structured(cls, records: np.ndarray) -> 'SimulationAnalyzer':
+        """
+        Build an analyzer directly on a TRIAL_DTYPE record array.
+        
+        The array becomes the backing store as-is (no per-trial ingestion or
+        copy); result dicts are only built on demand by to_dict_list.
+        
+        Parameters:
+        -----------
+        records : np.ndarray
+            Structured array with dtype TRIAL_DTYPE, one record per trial
+        
+        Returns:
+        --------
+        SimulationAnalyzer : Analyzer holding the given trials
+        """
+        if records.dtype != TRIAL_DTYPE:
+            raise ValueError(f"Expected TRIAL_DTYPE records, got {records.dtype}")
+        
+        analyzer = cls(initial_capacity=0)
+        analyzer._records = records
+        analyzer._num_trials = analyzer._record_only_trials = len(records)
+        return analyzer
+    
+    def to_dict_list(self) -> List[Dict[str, Any]]:
+        """
+        Return all trial results as a list of dicts.
+        
+        Trials added through add_trial_result are returned as given; trials
+        from from_structured are wrapped from their records here.
+        
+        Returns:
+        --------
+        list : One result dict per trial, in insertion order
+        """
+        head = self._records[:self._record_only_trials]
+        keys = [key for _, key in self.RESULT_KEYS]
+        columns = [head[field].tolist() for field, _ in self.RESULT_KEYS]
+        wrapped = [dict(zip(keys, values)) for values in zip(*columns)]
+        return wrapped + self.results
     
     def add_trial_result(self, result: Dict[str, Any]):
         """Add a single trial result."""
+        if self._num_trials == len(self._records):
+            grown = np.empty(max(1, 2 * len(self._records)), dtype=TRIAL_DTYPE)
+            grown[:self._num_trials] = self._records[:self._num_trials]
+            self._records = grown
+        
+        self._records[self._num_trials] = SimulationDataManager.trial_record(result)
+        self._num_trials += 1
         self.results.append(result)
+        self._dirty = True
     
     def compute_statistics(self) -> Dict[str, Any]:
         """
         Compute comprehensive statistics from all trial results.
         
+        The result is cached until the next add_trial_result call.
+        
         Returns:
         --------
         dict : Statistical analysis results
         """
-        if not self.results:
+        if not self._dirty:
+            return self.statistics
+        
+        if not self._num_trials:
             logger.warning("No results to analyze")
             return {}
         
-        # Extract metrics
-        qber_values = [r.get('qber', 0) for r in self.results]
-        sifted_lengths = [r.get('sifted_key_length', 0) for r in self.results]
-        final_lengths = [r.get('final_key_length', 0) for r in self.results]
-        key_rates = [r.get('key_rate', 0) for r in self.results]
-        
-        statistics = {
-            'num_trials': len(self.results),
-            'qber': {
-                'mean': float(np.mean(qber_values)),
-                'std': float(np.std(qber_values)),
-                'min': float(np.min(qber_values)),
-                'max': float(np.max(qber_values)),
-                'median': float(np.median(qber_values))
-            },
-            'sifted_key': {
-                'mean': float(np.mean(sifted_lengths)),
-                'std': float(np.std(sifted_lengths)),
-                'min': float(np.min(sifted_lengths)),
-                'max': float(np.max(sifted_lengths))
-            },
-            'final_key': {
-                'mean': float(np.mean(final_lengths)),
-                'std': float(np.std(final_lengths)),
-                'min': float(np.min(final_lengths)),
-                'max': float(np.max(final_lengths))
-            },
-            'key_rate': {
-                'mean': float(np.mean(key_rates)),
-                'std': float(np.std(key_rates)),
-                'min': float(np.min(key_rates)),
-                'max': float(np.max(key_rates))
+        # Gather the summarized fields into one (trials x metrics) float64
+        # block (exact for the int32 columns), then do one reduction per
+        # statistic over all columns at once
+        fields = [field for field, _ in self.METRIC_COLUMNS]
+        metrics = rfn.structured_to_unstructured(self._records[:self._num_trials][fields],
+                                                 dtype=np.float64)
+        means, stds = StatisticsUtils.mean_std(metrics, axis=0)
+        mins, maxs = StatisticsUtils.min_max(metrics, axis=0)
+        
+        statistics = {'num_trials': self._num_trials}
+        for col, (_, name) in enumerate(self.METRIC_COLUMNS):
+            statistics[name] = {
+                'mean': float(means[col]),
+                'std': float(stds[col]),
+                'min': float(mins[col]),
+                'max': float(maxs[col])
             }
-        }
+        statistics['qber']['median'] = float(np.median(metrics[:, 0]))
         
         self.statistics = statistics
+        self._dirty = False
         return statistics
     
     def performance_summary(self) -> str:
         """Generate human-readable performance summary."""
-        if not self.statistics:
-            self.compute_statistics()
+        stats = self.compute_statistics()
+        qber = stats['qber']
+        sifted = stats['sifted_key']
+        final = stats['final_key']
+        rate = stats['key_rate']
         
         summary = [
-            "="*60,
+            REPORT_RULE,
             "SIMULATION PERFORMANCE SUMMARY",
-            "="*60,
-            f"Total trials: {self.statistics['num_trials']}",
+            REPORT_RULE,
+            f"Total trials: {stats['num_trials']}",
             "",
             "QUANTUM BIT ERROR RATE (QBER):",
-            f"  Mean: {self.statistics['qber']['mean']:.6f}",
-            f"  Std Dev: {self.statistics['qber']['std']:.6f}",
-            f"  Range: [{self.statistics['qber']['min']:.6f}, {self.statistics['qber']['max']:.6f}]",
+            f"  Mean: {qber['mean']:.6f}",
+            f"  Std Dev: {qber['std']:.6f}",
+            f"  Range: [{qber['min']:.6f}, {qber['max']:.6f}]",
             "",
             "SIFTED KEY LENGTH:",
-            f"  Mean: {self.statistics['sifted_key']['mean']:.0f}",
-            f"  Std Dev: {self.statistics['sifted_key']['std']:.0f}",
-            f"  Range: [{self.statistics['sifted_key']['min']:.0f}, {self.statistics['sifted_key']['max']:.0f}]",
+            f"  Mean: {sifted['mean']:.0f}",
+            f"  Std Dev: {sifted['std']:.0f}",
+            f"  Range: [{sifted['min']:.0f}, {sifted['max']:.0f}]",
             "",
             "FINAL SECURE KEY LENGTH:",
-            f"  Mean: {self.statistics['final_key']['mean']:.0f}",
-            f"  Std Dev: {self.statistics['final_key']['std']:.0f}",
-            f"  Range: [{self.statistics['final_key']['min']:.0f}, {self.statistics['final_key']['max']:.0f}]",
+            f"  Mean: {final['mean']:.0f}",
+            f"  Std Dev: {final['std']:.0f}",
+            f"  Range: [{final['min']:.0f}, {final['max']:.0f}]",
             "",
             "KEY GENERATION RATE:",
-            f"  Mean: {self.statistics['key_rate']['mean']:.6f} bits/qubit",
-            f"  Std Dev: {self.statistics['key_rate']['std']:.6f}",
-            f"  Range: [{self.statistics['key_rate']['min']:.6f}, {self.statistics['key_rate']['max']:.6f}]",
-            "="*60
+            f"  Mean: {rate['mean']:.6f} bits/qubit",
+            f"  Std Dev: {rate['std']:.6f}",
+            f"  Range: [{rate['min']:.6f}, {rate['max']:.6f}]",
+            REPORT_RULE
         ]
         
         return "\n".join(summary)
     
     def save_results(self, filepath: str):
         """Save analysis results to JSON file."""
-        if not self.statistics:
-            self.compute_statistics()
+        self.compute_statistics()
         
         output_data = {
             'statistics': self.statistics,
-            'results': self.results
+            'results': self.to_dict_list()
         }
         
-        with open(filepath, 'w') as f:
-            json.dump(output_data, f, indent=2)
+        if ORJSON_AVAILABLE:
+            # Encoded in C straight to bytes, including any NumPy values
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(output_data,
+                                     option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(filepath, 'w') as f:
+                json.dump(output_data, f, indent=2)
         
         logger.info(f"Results saved to {filepath}")
 
@@ -172,67 +297,89 @@ class PerformanceMetrics:
     
     @staticmethod
     def secure_key_rate(
-        qber: float,
-        sifted_key_rate: float,
-        h_qber: float = None
-    ) -> float:
+        qber: Union[float, np.ndarray],
+        sifted_key_rate: Union[float, np.ndarray],
+        h_qber: Union[float, np.ndarray] = None
+    ) -> Union[float, np.ndarray]:
         """
         Calculate secure key rate using GLLP formula.
         
         Parameters:
         -----------
-        qber : float
+        qber : float or array_like
             Observed quantum bit error rate
-        sifted_key_rate : float
+        sifted_key_rate : float or array_like
             Rate of sifted key generation (bits/s)
-        h_qber : float
+        h_qber : float or array_like
             Binary entropy function of QBER
             
         Returns:
         --------
-        float : Secure key rate (bits/s)
+        float or np.ndarray : Secure key rate (bits/s), matching the input shape
         """
         if h_qber is None:
             h_qber = PerformanceMetrics.binary_entropy(qber)
         
+        if np.isscalar(h_qber) and np.isscalar(sifted_key_rate):
+            if CYTHON_ENTROPY_AVAILABLE:
+                return _entropy.secure_key_rate(float(sifted_key_rate), float(h_qber))
+            return _secure_key_rate_scalar(float(sifted_key_rate), float(h_qber))
+        
         # GLLP secure key rate
         # R_secure = sift_efficiency * [1 - 2*H(QBER)]
-        secure_rate = sifted_key_rate * (1 - 2 * h_qber)
+        secure_rate = np.maximum(0.0, np.multiply(sifted_key_rate, 1 - 2 * np.asarray(h_qber)))
         
-        return max(0, secure_rate)
+        return secure_rate if secure_rate.ndim else float(secure_rate)
     
     @staticmethod
-    def binary_entropy(x: float) -> float:
+    def binary_entropy(x: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
         """
         Calculate binary entropy H(x) = -x*log2(x) - (1-x)*log2(1-x).
         
         Parameters:
         -----------
-        x : float
-            Probability value (0 to 1)
+        x : float or array_like
+            Probability value(s) (0 to 1)
             
         Returns:
         --------
-        float : Binary entropy
+        float or np.ndarray : Binary entropy, 0 outside the open interval (0, 1)
         """
-        if x <= 0 or x >= 1:
-            return 0
+        if np.isscalar(x):
+            if CYTHON_ENTROPY_AVAILABLE:
+                return _entropy.binary_entropy(float(x))
+            return _binary_entropy_scalar(float(x))
+        
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 0:
+            return PerformanceMetrics.binary_entropy(float(x))
+        
+        if CYTHON_ENTROPY_AVAILABLE:
+            flat = np.ascontiguousarray(x).ravel()
+            entropy = np.empty_like(flat)
+            _entropy.binary_entropy_vec(flat, entropy)
+            return entropy.reshape(x.shape)
         
-        return -x * np.log2(x) - (1 - x) * np.log2(1 - x)
+        # Evaluate the logs only where they are defined; the rest stays 0
+        inside = (x > 0) & (x < 1)
+        entropy = np.zeros_like(x)
+        xm = x[inside]
+        entropy[inside] = -xm * np.log2(xm) - (1 - xm) * np.log2(1 - xm)
+        return entropy
     
     @staticmethod
-    def compute_channel_capacity(noise_rate: float) -> float:
+    def compute_channel_capacity(noise_rate: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
         """
         Compute classical capacity of noisy quantum channel.
         
         Parameters:
         -----------
-        noise_rate : float
+        noise_rate : float or array_like
             Depolarization rate
             
         Returns:
         --------
-        float : Channel capacity (bits per use)
+        float or np.ndarray : Channel capacity (bits per use)
         """
         # For depolarizing channel
         h_noise = PerformanceMetrics.binary_entropy(noise_rate)
@@ -251,68 +398,74 @@ class ComparativeAnalysis:
         """Add results for a scenario."""
         self.scenario_results[name] = results
     
-    def compare_qber(self) -> Dict[str, float]:
-        """Compare QBER across scenarios."""
-        comparison = {}
+    def _compare_all(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Collect mean QBER and mean key rate per scenario in one pass."""
+        qber_comparison = {}
+        rate_comparison = {}
         for scenario, results in self.scenario_results.items():
             if 'qber' in results:
-                avg_qber = results['qber'].get('mean', 0)
-                comparison[scenario] = avg_qber
+                qber_comparison[scenario] = results['qber'].get('mean', 0)
+            if 'key_rate' in results:
+                rate_comparison[scenario] = results['key_rate'].get('mean', 0)
         
-        return comparison
+        return qber_comparison, rate_comparison
+    
+    def compare_qber(self) -> Dict[str, float]:
+        """Compare QBER across scenarios."""
+        return self._compare_all()[0]
     
     def compare_key_rates(self) -> Dict[str, float]:
         """Compare key generation rates across scenarios."""
-        comparison = {}
-        for scenario, results in self.scenario_results.items():
-            if 'key_rate' in results:
-                avg_rate = results['key_rate'].get('mean', 0)
-                comparison[scenario] = avg_rate
-        
-        return comparison
+        return self._compare_all()[1]
+    
+    @staticmethod
+    def _ranked(comparison: Dict[str, float], descending: bool = False) -> List[Tuple[str, float]]:
+        """Order scenarios by value with a stable NumPy argsort (ties keep insertion order)."""
+        names = list(comparison.keys())
+        values = np.fromiter(comparison.values(), dtype=np.float64, count=len(names))
+        order = np.argsort(-values if descending else values, kind='stable')
+        return [(names[i], values[i]) for i in order]
     
     def generate_comparison_report(self) -> str:
         """Generate comparative analysis report."""
         lines = [
-            "="*60,
+            REPORT_RULE,
             "COMPARATIVE SCENARIO ANALYSIS",
-            "="*60,
+            REPORT_RULE,
             ""
         ]
         
+        qber_comp, rate_comp = self._compare_all()
+        
         # QBER comparison
-        qber_comp = self.compare_qber()
         lines.append("QBER Comparison:")
-        for scenario, qber in sorted(qber_comp.items(), key=lambda x: x[1]):
+        for scenario, qber in self._ranked(qber_comp):
             lines.append(f"  {scenario:.<30} {qber:.6f}")
         
         lines.append("")
         
         # Key rate comparison
-        rate_comp = self.compare_key_rates()
         lines.append("Key Rate Comparison (bits/qubit):")
-        for scenario, rate in sorted(rate_comp.items(), key=lambda x: -x[1]):
+        for scenario, rate in self._ranked(rate_comp, descending=True):
             lines.append(f"  {scenario:.<30} {rate:.6f}")
         
-        lines.append("="*60)
+        lines.append(REPORT_RULE)
         
         return "\n".join(lines)
 
 
 if __name__ == "__main__":
-    # Example usage
-    analyzer = SimulationAnalyzer()
+    # Example usage: simulate some trial results straight into a record
+    # array, filling each column for all trials at once
+    num_trials = 5
+    rng = np.random.default_rng()
+    trials = np.zeros(num_trials, dtype=TRIAL_DTYPE)
+    trials['qber'] = 0.01 + rng.normal(0, 0.002, num_trials)
+    trials['sift'] = 2500 + rng.integers(-100, 100, num_trials)
+    trials['final'] = 1250 + rng.integers(-50, 50, num_trials)
+    trials['rate'] = 0.25 + rng.normal(0, 0.01, num_trials)
     
-    # Simulate some trial results
-    for i in range(5):
-        result = {
-            'trial': i + 1,
-            'qber': 0.01 + np.random.normal(0, 0.002),
-            'sifted_key_length': 2500 + np.random.randint(-100, 100),
-            'final_key_length': 1250 + np.random.randint(-50, 50),
-            'key_rate': 0.25 + np.random.normal(0, 0.01)
-        }
-        analyzer.add_trial_result(result)
+    analyzer = SimulationAnalyzer.from_structured(trials)
     
     # Compute and print statistics
     stats = analyzer.compute_statistics()
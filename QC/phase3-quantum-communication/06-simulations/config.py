@@ -31,11 +31,32 @@ Date: 2026
 """
 
 import json
-from dataclasses import dataclass, asdict
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from functools import cached_property
 from typing import Dict, Any
 
+# Optional fast JSON encoder with native NumPy support
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-@dataclass
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10+
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Mode for newly saved files: what open() would give under the process umask.
+# The umask can only be read by setting it, so this is done once at import
+# rather than racing other threads on every save.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+@dataclass(**DATACLASS_SLOTS)
 class SimulationConfig:
     """Configuration parameters for BB84 simulations."""
     
@@ -58,11 +79,20 @@ class SimulationConfig:
     results_dir: str = "./results"
     enable_logging: bool = True
     log_level: str = "INFO"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return fields as a dict (shallow; all fields are primitives)."""
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
 
 
 @dataclass
 class ChannelModel:
-    """Quantum channel model specifications."""
+    """
+    Quantum channel model specifications.
+    
+    The description is formatted on first use and cached until a field is
+    assigned.
+    """
     
     # Noise model
     noise_type: str = "depolarizing"  # depolarizing, amplitude_damping, phase_damping
@@ -76,17 +106,35 @@ class ChannelModel:
     distance_km: float = 0.0
     attenuation_db_per_km: float = 0.0
     
-    def describe(self) -> str:
-        """Return description of channel model."""
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Any field change invalidates the cached description
+        self.__dict__.pop('description', None)
+    
+    @cached_property
+    def description(self) -> str:
+        """Formatted description (not a field, so not in to_dict/repr)."""
         desc = f"{self.noise_type.upper()} Channel (rate={self.noise_rate})"
         if self.has_loss:
             desc += f", Loss={self.loss_rate}"
         return desc
+    
+    def describe(self) -> str:
+        """Return description of channel model."""
+        return self.description
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return fields as a dict (shallow; all fields are primitives)."""
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
 
 
 @dataclass
 class ExperimentalSetup:
-    """Experimental setup and equipment parameters."""
+    """
+    Experimental setup and equipment parameters.
+    
+    Like ChannelModel, the description is cached until a field is assigned.
+    """
     
     # Source specifications
     source_type: str = "ideal_source"  # ideal_source, attenuated_laser
@@ -100,13 +148,27 @@ class ExperimentalSetup:
     # Timing
     pulse_rate_mhz: float = 1.0
     
-    def describe(self) -> str:
-        """Return description of setup."""
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Any field change invalidates the cached description
+        self.__dict__.pop('description', None)
+    
+    @cached_property
+    def description(self) -> str:
+        """Formatted description (not a field, so not in to_dict/repr)."""
         return (
             f"{self.source_type} | "
             f"Det Eff: {self.detector_efficiency*100:.1f}% | "
             f"Pulse Rate: {self.pulse_rate_mhz} MHz"
         )
+    
+    def describe(self) -> str:
+        """Return description of setup."""
+        return self.description
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return fields as a dict (shallow; all fields are primitives)."""
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
 
 
 # Default configurations for different scenarios
@@ -173,6 +235,22 @@ REALISTIC_SETUP = ExperimentalSetup(
     pulse_rate_mhz=1.0
 )
 
+# Scenario lookup tables for ConfigManager.set_scenario; scenarios without
+# an explicit entry use the noisy channel and the realistic setup
+_SCENARIOS = {
+    'ideal': IDEAL_SCENARIO,
+    'realistic': REALISTIC_SCENARIO,
+    'noisy': NOISY_SCENARIO,
+    'long_distance': LONG_DISTANCE_SCENARIO
+}
+_CHANNELS = {
+    'ideal': IDEAL_CHANNEL,
+    'realistic': REALISTIC_CHANNEL
+}
+_SETUPS = {
+    'ideal': IDEAL_SETUP
+}
+
 
 class ConfigManager:
     """Manages configuration for simulations."""
@@ -191,41 +269,54 @@ class ConfigManager:
         scenario_name : str
             One of: 'ideal', 'realistic', 'noisy', 'long_distance'
         """
-        scenarios = {
-            'ideal': IDEAL_SCENARIO,
-            'realistic': REALISTIC_SCENARIO,
-            'noisy': NOISY_SCENARIO,
-            'long_distance': LONG_DISTANCE_SCENARIO
-        }
-        
-        if scenario_name not in scenarios:
+        if scenario_name not in _SCENARIOS:
             raise ValueError(f"Unknown scenario: {scenario_name}")
         
-        self.config = scenarios[scenario_name]
+        self.config = _SCENARIOS[scenario_name]
         
         # Also set corresponding channel
-        if scenario_name == 'ideal':
-            self.channel = IDEAL_CHANNEL
-            self.setup = IDEAL_SETUP
-        elif scenario_name == 'realistic':
-            self.channel = REALISTIC_CHANNEL
-            self.setup = REALISTIC_SETUP
-        else:
-            self.channel = NOISY_CHANNEL
-            self.setup = REALISTIC_SETUP
+        self.channel = _CHANNELS.get(scenario_name, NOISY_CHANNEL)
+        self.setup = _SETUPS.get(scenario_name, REALISTIC_SETUP)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert configuration to dictionary."""
         return {
-            'simulation': asdict(self.config),
-            'channel': asdict(self.channel),
-            'setup': asdict(self.setup)
+            'simulation': self.config.to_dict(),
+            'channel': self.channel.to_dict(),
+            'setup': self.setup.to_dict()
         }
     
     def save_to_json(self, filepath: str):
-        """Save configuration to JSON file."""
-        with open(filepath, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
+        """
+        Save configuration to JSON file.
+        
+        Written to a temporary file in the same directory and renamed over
+        filepath, so readers never see a partially written config. The file
+        keeps the mode of the config it replaces, or gets NEW_FILE_MODE.
+        """
+        if ORJSON_AVAILABLE:
+            data = orjson.dumps(self.to_dict(),
+                                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            data = json.dumps(self.to_dict(), indent=2).encode()
+        
+        try:
+            mode = os.stat(filepath).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = NEW_FILE_MODE
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filepath)),
+                                        suffix='.tmp')
+        try:
+            # mkstemp creates the file 0600; give it the target's mode
+            if hasattr(os, 'fchmod'):
+                os.fchmod(fd, mode)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
     
     def __str__(self) -> str:
         """String representation."""
@@ -40,19 +40,54 @@ Date: 2026
 """
 
 import numpy as np
-from netsquid.components.qsource import QSource, SourceStatus
-from netsquid.components.qprocessor import QuantumProcessor, PhysicalInstruction
-from netsquid.components.models import DepolarNoiseModel
-from netsquid.nodes import Node, Network
-from netsquid.qObj import Qobj
-from netsquid.util.simtools import run_simulations
+import multiprocessing
+import random
 import logging
+import sys
+from pathlib import Path
+
+# Add utils to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
+
+from qc_utils import count_bit_errors
+
+# Optional Numba for the compiled per-qubit transmission kernel
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Below this many qubits a trial runs on Python ints, where NumPy's
+# per-call overhead would outweigh the work itself
+SMALL_TRIAL_QUBITS = 64
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, boundscheck=False, cache=True)
+    def _transmit_kernel(alice_bits, alice_bases, bob_bases, depolarization_rate,
+                         uniforms, random_bits):
+        """
+        Per-qubit channel model over pre-drawn randomness, one prange pass.
+        
+        uniforms decides depolarization errors on matched bases and
+        random_bits supplies Bob's outcome on mismatched ones.
+        """
+        out = np.empty_like(alice_bits)
+        for i in prange(alice_bits.shape[0]):
+            if alice_bases[i] == bob_bases[i]:
+                # Bases match - flip the bit on a depolarization error
+                out[i] = alice_bits[i] ^ (uniforms[i] < depolarization_rate)
+            else:
+                # Bases don't match - Bob's measurement is random
+                out[i] = random_bits[i]
+        return out
+
+
 class BB84Simulation:
     """
     Implements BB84 Quantum Key Distribution Protocol.
@@ -65,58 +100,89 @@ class BB84Simulation:
         Quantum channel depolarization rate (0.0 to 1.0)
     num_trials : int
         Number of independent trials to run
+    seed : int, optional
+        Seed for the simulation's random generator (None for fresh entropy)
     """
     
-    def __init__(self, num_qubits=1000, depolarization_rate=0.01, num_trials=10):
+    def __init__(self, num_qubits=1000, depolarization_rate=0.01, num_trials=10, seed=None):
         self.num_qubits = num_qubits
         self.depolarization_rate = depolarization_rate
         self.num_trials = num_trials
         
-        # Results storage
+        # Generator shared by every random draw across all trials
+        self._rng = np.random.default_rng(seed)
+        
+        # Results storage: one array per field, one row/entry per recorded
+        # trial, preallocated for num_trials rows and grown if more are run
         self.raw_keys = []
-        self.sifted_keys = []
-        self.qber_values = []
+        trial_shape = (num_trials, num_qubits)
+        self.trial_numbers = np.zeros(num_trials, dtype=np.int64)
+        self.alice_bits = np.empty(trial_shape, dtype=np.uint8)
+        self.alice_bases = np.empty(trial_shape, dtype=np.uint8)
+        self.bob_bases = np.empty(trial_shape, dtype=np.uint8)
+        self.bob_measurements = np.empty(trial_shape, dtype=np.uint8)
+        self.sifted_key_lengths = np.zeros(num_trials, dtype=np.int64)
+        self.qber_values = np.zeros(num_trials)
+        self.num_completed = 0
         self.key_rates = []
         
+    @property
+    def sifted_keys(self):
+        """Sifted key (Alice's bits on matching bases) of each recorded trial, as lists."""
+        done = self.num_completed
+        sift_masks = self.alice_bases[:done] == self.bob_bases[:done]
+        return [bits[mask].tolist() for bits, mask in zip(self.alice_bits[:done], sift_masks)]
+    
     def run_trial(self, trial_num):
         """
         Run a single BB84 protocol trial.
         
         Returns:
         --------
-        dict : Trial results including raw key, sifted key, and QBER
+        dict : Trial results including raw key, sifted key length, and QBER
         """
         logger.info(f"Starting trial {trial_num + 1}/{self.num_trials}")
+        result = self._simulate_trial(trial_num, self._rng)
+        self._record_trial(result)
+        return result
+    
+    def _simulate_trial(self, trial_num, rng):
+        """
+        Simulate one trial with the given generator, without touching the
+        stored results (safe to run in a worker process).
+        
+        Returns:
+        --------
+        dict : Trial results including raw key, sifted key length, and QBER
+        """
+        if self.num_qubits < SMALL_TRIAL_QUBITS:
+            return self._simulate_small_trial(trial_num, rng)
         
-        # Step 1: Alice prepares random bits and bases
-        alice_bits = np.random.randint(0, 2, self.num_qubits)
-        alice_bases = np.random.randint(0, 2, self.num_qubits)
+        # Step 1: Alice prepares random bits and bases (one byte per bit)
+        alice_bits = rng.integers(0, 2, self.num_qubits, dtype=np.uint8)
+        alice_bases = rng.integers(0, 2, self.num_qubits, dtype=np.uint8)
         # 0 = Rectilinear (Z), 1 = Diagonal (X)
         
         # Step 2: Bob randomly chooses measurement bases
-        bob_bases = np.random.randint(0, 2, self.num_qubits)
+        bob_bases = rng.integers(0, 2, self.num_qubits, dtype=np.uint8)
         
         # Step 3: Bob measures with randomly chosen bases
         # Simulate measurement outcomes with depolarization noise
         bob_measurements = self._simulate_quantum_transmission(
-            alice_bits, alice_bases, bob_bases
+            alice_bits, alice_bases, bob_bases, rng
         )
         
-        # Step 4: Sifting - retain bits where bases match
+        # Step 4: Sifting - bits where bases match form the sifted key; only
+        # its length is kept, so the bits are never gathered out
         sift_mask = alice_bases == bob_bases
-        sifted_bits_alice = alice_bits[sift_mask]
-        sifted_bits_bob = bob_measurements[sift_mask]
-        
-        sifted_key = sifted_bits_alice.tolist()
-        self.sifted_keys.append(sifted_key)
+        sifted_key_length = int(np.count_nonzero(sift_mask))
         
-        # Step 5: Calculate QBER
-        if len(sifted_bits_alice) > 0:
-            qber = np.sum(sifted_bits_alice != sifted_bits_bob) / len(sifted_bits_alice)
+        # Step 5: Calculate QBER over the sifted positions
+        if sifted_key_length > 0:
+            errors = count_bit_errors(alice_bits, bob_measurements, sift_mask)
+            qber = errors / sifted_key_length
         else:
             qber = 0.0
-            
-        self.qber_values.append(qber)
         
         # Store results
         result = {
@@ -125,58 +191,182 @@ class BB84Simulation:
             'alice_bases': alice_bases,
             'bob_bases': bob_bases,
             'bob_measurements': bob_measurements,
-            'sifted_key_length': len(sifted_key),
+            'sifted_key_length': sifted_key_length,
             'qber': qber
         }
         
         return result
     
-    def _simulate_quantum_transmission(self, alice_bits, alice_bases, bob_bases):
+    def _simulate_small_trial(self, trial_num, rng):
+        """
+        Pure-Python version of _simulate_trial for small trials.
+        
+        Each bit string is a single int (bit i = qubit i) drawn with
+        random.getrandbits, seeded from the given generator; sifting and
+        error counting are bitwise ops and popcounts on those ints.
+        """
+        n = self.num_qubits
+        py_rng = random.Random(int(rng.bit_generator.random_raw()))
+        all_qubits = (1 << n) - 1
+        
+        # Steps 1-2: random bits and bases for Alice, bases for Bob
+        alice_bits = py_rng.getrandbits(n)
+        alice_bases = py_rng.getrandbits(n)
+        bob_bases = py_rng.getrandbits(n)
+        
+        # Step 3: depolarization flips on matched bases, random bits otherwise
+        sift_mask = ~(alice_bases ^ bob_bases) & all_qubits
+        flips = 0
+        for i in range(n):
+            if py_rng.random() < self.depolarization_rate:
+                flips |= 1 << i
+        random_bits = py_rng.getrandbits(n)
+        bob_measurements = ((alice_bits ^ flips) & sift_mask) | (random_bits & ~sift_mask)
+        
+        # Steps 4-5: sifted key length and QBER by popcount
+        sifted_key_length = bin(sift_mask).count('1')
+        if sifted_key_length > 0:
+            errors = bin((alice_bits ^ bob_measurements) & sift_mask).count('1')
+            qber = errors / sifted_key_length
+        else:
+            qber = 0.0
+        
+        def to_bits(value):
+            # Bit i of the int -> entry i of a uint8 array, like the NumPy path
+            raw = np.frombuffer(value.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+            return np.unpackbits(raw, count=n, bitorder='little')
+        
+        return {
+            'trial': trial_num + 1,
+            'alice_bits': to_bits(alice_bits),
+            'alice_bases': to_bits(alice_bases),
+            'bob_bases': to_bits(bob_bases),
+            'bob_measurements': to_bits(bob_measurements),
+            'sifted_key_length': sifted_key_length,
+            'qber': qber
+        }
+    
+    def _record_trial(self, result):
+        """Store one trial's outcome in the next free row of the result arrays."""
+        row = self.num_completed
+        if row == len(self.qber_values):
+            self._grow_storage(max(1, 2 * row))
+        self.trial_numbers[row] = result['trial']
+        self.alice_bits[row] = result['alice_bits']
+        self.alice_bases[row] = result['alice_bases']
+        self.bob_bases[row] = result['bob_bases']
+        self.bob_measurements[row] = result['bob_measurements']
+        self.sifted_key_lengths[row] = result['sifted_key_length']
+        self.qber_values[row] = result['qber']
+        self.num_completed += 1
+    
+    def _grow_storage(self, rows):
+        """Resize the result arrays to hold rows trials, keeping recorded ones."""
+        for name in ('trial_numbers', 'alice_bits', 'alice_bases', 'bob_bases',
+                     'bob_measurements', 'sifted_key_lengths', 'qber_values'):
+            old = getattr(self, name)
+            new = np.zeros((rows,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+    
+    def trial_results(self):
+        """
+        Return the completed trials' results as arrays.
+        
+        Returns:
+        --------
+        dict : Field name -> array with one row/entry per completed trial
+        """
+        done = self.num_completed
+        return {
+            'trial': self.trial_numbers[:done],
+            'alice_bits': self.alice_bits[:done],
+            'alice_bases': self.alice_bases[:done],
+            'bob_bases': self.bob_bases[:done],
+            'bob_measurements': self.bob_measurements[:done],
+            'sifted_key_length': self.sifted_key_lengths[:done],
+            'qber': self.qber_values[:done]
+        }
+    
+    def _simulate_quantum_transmission(self, alice_bits, alice_bases, bob_bases, rng=None):
         """
         Simulate quantum transmission with noise.
         
         In the ideal case (no noise), Bob gets the correct bit when bases match.
         With depolarization, there's a probability of error.
         """
-        bob_measurements = np.zeros(len(alice_bits), dtype=int)
+        rng = self._rng if rng is None else rng
+        n = len(alice_bits)
         
-        for i in range(len(alice_bits)):
-            if alice_bases[i] == bob_bases[i]:
-                # Bases match - ideally Bob should measure correctly
-                # But depolarization introduces errors
-                if np.random.random() < self.depolarization_rate:
-                    bob_measurements[i] = 1 - alice_bits[i]  # Error
-                else:
-                    bob_measurements[i] = alice_bits[i]  # Correct
-            else:
-                # Bases don't match - Bob's measurement is random
-                bob_measurements[i] = np.random.randint(0, 2)
+        if NUMBA_AVAILABLE:
+            # Randomness is drawn here so the kernel stays RNG-free
+            return _transmit_kernel(alice_bits, alice_bases, bob_bases,
+                                    self.depolarization_rate, rng.random(n),
+                                    rng.integers(0, 2, n, dtype=np.uint8))
+        
+        # Bases match - ideally Bob should measure correctly,
+        # but depolarization flips the bit with some probability
+        errors = rng.random(n) < self.depolarization_rate
+        matched = np.where(errors, alice_bits ^ 1, alice_bits)
         
-        return bob_measurements
+        # Bases don't match - Bob's measurement is random
+        random_bits = rng.integers(0, 2, n, dtype=np.uint8)
+        
+        return np.where(alice_bases == bob_bases, matched, random_bits)
     
-    def run_all_trials(self):
-        """Run all BB84 protocol trials."""
+    def run_all_trials(self, processes=1):
+        """
+        Run all BB84 protocol trials.
+        
+        By default the trials run in this process. Since they are
+        independent, processes other than 1 spreads them over a process pool
+        instead, each with its own generator spawned from the simulation's
+        (reproducible when a seed is given). Worker processes re-import the
+        calling script, so a pool needs an if __name__ == "__main__" guard.
+        
+        Parameters:
+        -----------
+        processes : int, optional
+            Worker processes (1 to run in this process, None for one per CPU)
+        
+        Returns:
+        --------
+        dict : Per-trial results as arrays (see trial_results)
+        """
         logger.info(f"Running {self.num_trials} BB84 protocol trials")
         
-        results = []
-        for trial in range(self.num_trials):
-            result = self.run_trial(trial)
-            results.append(result)
+        # Each run replaces the previously recorded trials
+        self.num_completed = 0
+        
+        if processes == 1:
+            for trial in range(self.num_trials):
+                self.run_trial(trial)
+        else:
+            trial_rngs = self._rng.spawn(self.num_trials)
+            # Spawned (not forked) workers: Numba's threading layer is not fork-safe
+            with multiprocessing.get_context('spawn').Pool(processes) as pool:
+                outcomes = pool.starmap(simulate_trial,
+                                        [(self.num_qubits, self.depolarization_rate, trial, rng)
+                                         for trial, rng in enumerate(trial_rngs)])
+            for result in outcomes:
+                self._record_trial(result)
         
         self._calculate_statistics()
-        return results
+        return self.trial_results()
     
     def _calculate_statistics(self):
         """Calculate overall statistics from all trials."""
-        if len(self.sifted_keys) == 0:
+        if self.num_completed == 0:
             logger.warning("No sifted keys generated")
             return
         
-        sifted_lengths = [len(key) for key in self.sifted_keys]
+        sifted_lengths = self.sifted_key_lengths[:self.num_completed]
+        qber_values = self.qber_values[:self.num_completed]
+        
         avg_sifted_length = np.mean(sifted_lengths)
         
-        avg_qber = np.mean(self.qber_values)
-        max_qber = np.max(self.qber_values)
+        avg_qber = np.mean(qber_values)
+        max_qber = np.max(qber_values)
         
         # Key rate (bits per transmitted quantum state)
         key_rate = avg_sifted_length / self.num_qubits
@@ -193,25 +383,53 @@ class BB84Simulation:
     
     def get_summary(self):
         """Return simulation summary statistics."""
-        if len(self.sifted_keys) == 0:
+        if self.num_completed == 0:
             return None
         
-        sifted_lengths = [len(key) for key in self.sifted_keys]
+        sifted_lengths = self.sifted_key_lengths[:self.num_completed]
+        qber_values = self.qber_values[:self.num_completed]
         
         return {
             'num_trials': self.num_trials,
             'num_qubits_per_trial': self.num_qubits,
             'avg_sifted_key_length': np.mean(sifted_lengths),
             'std_sifted_key_length': np.std(sifted_lengths),
-            'avg_qber': np.mean(self.qber_values),
-            'std_qber': np.std(self.qber_values),
-            'min_qber': np.min(self.qber_values),
-            'max_qber': np.max(self.qber_values),
+            'avg_qber': np.mean(qber_values),
+            'std_qber': np.std(qber_values),
+            'min_qber': np.min(qber_values),
+            'max_qber': np.max(qber_values),
             'key_rate': np.mean(sifted_lengths) / self.num_qubits,
             'depolarization_rate': self.depolarization_rate
         }
 
 
+def simulate_trial(num_qubits, depolarization_rate, trial_num, rng):
+    """
+    Simulate one independent BB84 trial in a worker process.
+    
+    Module-level so the pool only pickles these arguments, not a
+    BB84Simulation with its preallocated result arrays; only the trial's
+    own arrays and scalars are sent back.
+    
+    Parameters:
+    -----------
+    num_qubits : int
+        Number of qubits to transmit
+    depolarization_rate : float
+        Quantum channel depolarization rate (0.0 to 1.0)
+    trial_num : int
+        Zero-based trial index
+    rng : np.random.Generator
+        Generator for the trial, spawned from the simulation's
+    
+    Returns:
+    --------
+    dict : Trial results including raw key, sifted key length, and QBER
+    """
+    simulation = BB84Simulation(num_qubits, depolarization_rate, num_trials=0)
+    return simulation._simulate_trial(trial_num, rng)
+
+
 def main():
     """Main function to run BB84 simulation."""
     
@@ -44,7 +44,18 @@ Date: 2026
 
 import numpy as np
 import logging
+import itertools
+import multiprocessing
+import sys
+from collections import OrderedDict
+from contextlib import nullcontext
 from datetime import datetime
+from pathlib import Path
+
+# Add utils to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'utils'))
+
+from qc_utils import count_bit_errors
 
 # Configure logging
 logging.basicConfig(
@@ -57,13 +68,14 @@ logger = logging.getLogger(__name__)
 class BB84Protocol:
     """Implementation of BB84 Quantum Key Distribution Protocol"""
     
-    def __init__(self, key_length=256, depolarize_rate=0.01):
+    def __init__(self, key_length=256, depolarize_rate=0.01, seed=None):
         """
         Initialize BB84 protocol simulation
         
         Args:
             key_length (int): Desired final key length
             depolarize_rate (float): Depolarization rate for quantum channel (0.0-1.0)
+            seed (int, optional): Seed for the protocol's random generator
         """
         self.key_length = key_length
         self.depolarize_rate = depolarize_rate
@@ -73,7 +85,8 @@ class BB84Protocol:
         self.bob_measurements = None
         self.sift_key = None
         self.qber = None
-        self.timestamp = datetime.now()
+        self.timestamp = None  # Set when run_simulation starts
+        self._rng = np.random.default_rng(seed)
         
     def alice_prepare_qubits(self, n_qubits):
         """
@@ -83,23 +96,15 @@ class BB84Protocol:
             n_qubits (int): Number of qubits to prepare
             
         Returns:
-            tuple: (bits, bases, prepared_states)
+            tuple: (bits, bases)
         """
-        bits = np.random.randint(0, 2, n_qubits)
-        bases = np.random.randint(0, 2, n_qubits)  # 0: rectilinear (+), 1: diagonal (x)
-        
-        states = []
-        for bit, basis in zip(bits, bases):
-            if basis == 0:  # Rectilinear basis
-                state = '|0⟩' if bit == 0 else '|1⟩'
-            else:  # Diagonal basis
-                state = '|+⟩' if bit == 0 else '|-⟩'
-            states.append(state)
+        bits = self._rng.integers(0, 2, n_qubits, dtype=np.uint8)
+        bases = self._rng.integers(0, 2, n_qubits, dtype=np.uint8)  # 0: rectilinear (+), 1: diagonal (x)
         
         self.alice_bits = bits
         self.alice_bases = bases
-        logger.info(f"Alice prepared {n_qubits} qubits in random bases")
-        return bits, bases, states
+        logger.debug("Alice prepared %d qubits in random bases", n_qubits)
+        return bits, bases
     
     def transmit_and_noise(self, measurements_without_noise):
         """
@@ -111,14 +116,13 @@ class BB84Protocol:
         Returns:
             np.array: Measurements with simulated noise
         """
-        measurements = measurements_without_noise.copy()
-        n_errors = np.random.binomial(len(measurements), self.depolarize_rate)
-        
-        if n_errors > 0:
-            error_positions = np.random.choice(len(measurements), n_errors, replace=False)
-            measurements[error_positions] = 1 - measurements[error_positions]
+        # Each qubit flips independently with the depolarization probability
+        flip_mask = self._rng.random(len(measurements_without_noise)) < self.depolarize_rate
+        measurements = measurements_without_noise ^ flip_mask.view(np.uint8)
         
-        logger.info(f"Simulated channel with {self.depolarize_rate:.4f} depolarization rate, {n_errors} errors introduced")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Simulated channel with %.4f depolarization rate, %d errors introduced",
+                         self.depolarize_rate, np.count_nonzero(flip_mask))
         return measurements
     
     def bob_measure_qubits(self, n_qubits):
@@ -131,13 +135,13 @@ class BB84Protocol:
         Returns:
             tuple: (bases, measurements)
         """
-        bases = np.random.randint(0, 2, n_qubits)
-        ideal_measurements = np.random.randint(0, 2, n_qubits)
+        bases = self._rng.integers(0, 2, n_qubits, dtype=np.uint8)
+        ideal_measurements = self._rng.integers(0, 2, n_qubits, dtype=np.uint8)
         measurements = self.transmit_and_noise(ideal_measurements)
         
         self.bob_bases = bases
         self.bob_measurements = measurements
-        logger.info(f"Bob measured {n_qubits} qubits in random bases")
+        logger.debug("Bob measured %d qubits in random bases", n_qubits)
         return bases, measurements
     
     def sift_keys(self):
@@ -153,7 +157,7 @@ class BB84Protocol:
         
         self.sift_key = alice_sift_key
         sift_count = len(alice_sift_key)
-        logger.info(f"Sift keys extracted: {sift_count} bits (25% of transmitted)")
+        logger.debug("Sift keys extracted: %d bits (25%% of transmitted)", sift_count)
         return alice_sift_key, bob_sift_key, sift_count
     
     def calculate_qber(self, alice_sift, bob_sift):
@@ -170,10 +174,10 @@ class BB84Protocol:
         if len(alice_sift) == 0:
             return 0.0
         
-        errors = np.sum(alice_sift != bob_sift)
+        errors = count_bit_errors(alice_sift, bob_sift)
         qber = errors / len(alice_sift)
         self.qber = qber
-        logger.info(f"QBER calculated: {qber:.4f} ({errors} errors in {len(alice_sift)} bits)")
+        logger.debug("QBER calculated: %.4f (%d errors in %d bits)", qber, errors, len(alice_sift))
         return qber
     
     def verify_security(self, threshold=0.11):
@@ -190,8 +194,8 @@ class BB84Protocol:
             return False
         
         is_secure = self.qber < threshold
-        status = "SECURE" if is_secure else "COMPROMISED"
-        logger.info(f"Security check: QBER={self.qber:.4f} vs threshold={threshold} → {status}")
+        logger.debug("Security check: QBER=%.4f vs threshold=%s → %s",
+                     self.qber, threshold, "SECURE" if is_secure else "COMPROMISED")
         return is_secure
     
     def run_simulation(self, n_qubits=1000):
@@ -204,13 +208,15 @@ class BB84Protocol:
         Returns:
             dict: Simulation results
         """
-        logger.info(f"\n{'='*60}")
-        logger.info(f"Starting BB84 Simulation - {self.timestamp}")
-        logger.info(f"Configuration: {n_qubits} qubits, {self.depolarize_rate:.4f} depolarization rate")
-        logger.info(f"{'='*60}\n")
+        self.timestamp = datetime.now()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"\n{'='*60}")
+            logger.info(f"Starting BB84 Simulation - {self.timestamp}")
+            logger.info(f"Configuration: {n_qubits} qubits, {self.depolarize_rate:.4f} depolarization rate")
+            logger.info(f"{'='*60}\n")
         
         # Step 1: Alice prepares qubits
-        alice_bits, alice_bases, states = self.alice_prepare_qubits(n_qubits)
+        alice_bits, alice_bases = self.alice_prepare_qubits(n_qubits)
         
         # Step 2: Bob measures qubits
         bob_bases, bob_measurements = self.bob_measure_qubits(n_qubits)
@@ -253,6 +259,38 @@ class BB84Protocol:
         return results
 
 
+# Outcomes of seeded noise-sweep trials, keyed by
+# (noise_rate, n_qubits, seed entropy, seed spawn_key), least recently used
+# first; the oldest are evicted beyond NOISE_TRIAL_CACHE_SIZE entries
+NOISE_TRIAL_CACHE_SIZE = 4096
+_noise_trial_cache = OrderedDict()
+
+
+def run_noise_trial(noise_rate, n_qubits, seed):
+    """
+    Run one independent BB84 trial for the noise sweep
+    
+    Module-level so it can be dispatched to worker processes; only the
+    scalars the sweep aggregates are sent back.
+    
+    Args:
+        noise_rate (float): Depolarization rate for the trial
+        n_qubits (int): Number of qubits to transmit
+        seed (np.random.SeedSequence): Seed for the trial's generator
+        
+    Returns:
+        tuple: (qber, sift_efficiency, is_secure)
+    """
+    protocol = BB84Protocol(key_length=256, depolarize_rate=noise_rate, seed=seed)
+    results = protocol.run_simulation(n_qubits)
+    return results['qber'], results['sift_efficiency'], results['is_secure']
+
+
+def _serial_starmap(func, args):
+    """In-process stand-in for Pool.starmap"""
+    return list(itertools.starmap(func, args))
+
+
 class NoiseAnalysis:
     """Analyze impact of quantum channel noise on BB84 protocol"""
     
@@ -260,14 +298,24 @@ class NoiseAnalysis:
         self.results = []
         logger.info("Initialized Noise Analysis module")
     
-    def analyze_noise_impact(self, noise_rates, trials_per_rate=10, n_qubits=1000):
+    def analyze_noise_impact(self, noise_rates, trials_per_rate=10, n_qubits=1000,
+                             processes=1, seed=None):
         """
         Analyze how different noise rates affect protocol performance
         
+        Trials are independent, each seeded from its own spawned SeedSequence.
+        They run in this process by default; processes other than 1 runs
+        them on a spawn-context process pool instead. With a root seed, trial
+        outcomes are memoized (the NOISE_TRIAL_CACHE_SIZE most recent), so
+        repeating a sweep point only simulates new trials.
+        
         Args:
             noise_rates (list): List of depolarization rates to test
             trials_per_rate (int): Number of trials per noise rate
             n_qubits (int): Number of qubits per trial
+            processes (int, optional): Worker processes (1 to run in this
+                process, None for one per CPU)
+            seed (int, optional): Root seed for reproducible sweeps
             
         Returns:
             dict: Analysis results
@@ -276,42 +324,90 @@ class NoiseAnalysis:
         logger.info(f"Noise rates: {noise_rates}")
         logger.info(f"Trials per rate: {trials_per_rate}, Qubits per trial: {n_qubits}\n")
         
-        for noise_rate in noise_rates:
-            qber_values = []
-            sift_efficiencies = []
-            secure_count = 0
-            
-            logger.info(f"Testing noise rate: {noise_rate:.4f}")
+        root_seed = np.random.SeedSequence(seed)
+        # Spawned (not forked) workers, as in netsquid/bb84_simulation.py
+        pool_context = (nullcontext() if processes == 1
+                        else multiprocessing.get_context('spawn').Pool(processes))
+        with pool_context as pool:
+            starmap = _serial_starmap if pool is None else pool.starmap
             
-            for trial in range(trials_per_rate):
-                protocol = BB84Protocol(key_length=256, depolarize_rate=noise_rate)
-                results = protocol.run_simulation(n_qubits)
+            for noise_rate in noise_rates:
+                logger.info(f"Testing noise rate: {noise_rate:.4f}")
                 
-                qber_values.append(results['qber'])
-                sift_efficiencies.append(results['sift_efficiency'])
-                if results['is_secure']:
-                    secure_count += 1
-            
-            avg_qber = np.mean(qber_values)
-            std_qber = np.std(qber_values)
-            avg_sift = np.mean(sift_efficiencies)
-            security_rate = secure_count / trials_per_rate
-            
-            analysis = {
-                'noise_rate': noise_rate,
-                'trials': trials_per_rate,
-                'avg_qber': avg_qber,
-                'std_qber': std_qber,
-                'avg_sift_efficiency': avg_sift,
-                'theoretical_qber': noise_rate * 0.25,
-                'secure_trials': secure_count,
-                'security_rate': security_rate
-            }
-            
-            self.results.append(analysis)
-            logger.info(f"  Results: QBER={avg_qber:.4f}±{std_qber:.4f}, Secure={security_rate:.0%}\n")
+                trial_seeds = root_seed.spawn(trials_per_rate)
+                if seed is None:
+                    # Fresh entropy never repeats, so there is nothing to reuse
+                    outcomes = starmap(run_noise_trial,
+                                       [(noise_rate, n_qubits, s) for s in trial_seeds])
+                else:
+                    outcomes = self._cached_noise_trials(starmap, noise_rate, n_qubits,
+                                                         trial_seeds)
+                self._summarize_noise_rate(noise_rate, trials_per_rate, outcomes)
         
         return self.results
+    
+    def _cached_noise_trials(self, starmap, noise_rate, n_qubits, trial_seeds):
+        """
+        Trial outcomes for seeded trials, simulating only uncached ones
+        
+        Args:
+            starmap (callable): Runs uncached trials, in process or on a pool
+            noise_rate (float): Depolarization rate for the trials
+            n_qubits (int): Number of qubits per trial
+            trial_seeds (list): One SeedSequence per trial
+            
+        Returns:
+            list: (qber, sift_efficiency, is_secure) per trial
+        """
+        keys = [(noise_rate, n_qubits, s.entropy, s.spawn_key) for s in trial_seeds]
+        outcomes = {key: _noise_trial_cache[key] for key in keys if key in _noise_trial_cache}
+        missing = [(key, s) for key, s in zip(keys, trial_seeds) if key not in outcomes]
+        
+        if missing:
+            fresh = starmap(run_noise_trial,
+                            [(noise_rate, n_qubits, s) for _, s in missing])
+            outcomes.update(zip([key for key, _ in missing], fresh))
+        
+        # Refresh this call's entries and evict the least recently used
+        for key in keys:
+            _noise_trial_cache[key] = outcomes[key]
+            _noise_trial_cache.move_to_end(key)
+        while len(_noise_trial_cache) > NOISE_TRIAL_CACHE_SIZE:
+            _noise_trial_cache.popitem(last=False)
+        
+        return [outcomes[key] for key in keys]
+    
+    def _summarize_noise_rate(self, noise_rate, trials_per_rate, outcomes):
+        """
+        Aggregate one noise rate's trial outcomes into self.results
+        
+        Args:
+            noise_rate (float): Depolarization rate that was tested
+            trials_per_rate (int): Number of trials run at this rate
+            outcomes (list): (qber, sift_efficiency, is_secure) per trial
+        """
+        qber_values = [qber for qber, _, _ in outcomes]
+        sift_efficiencies = [sift for _, sift, _ in outcomes]
+        secure_count = sum(1 for _, _, is_secure in outcomes if is_secure)
+        
+        avg_qber = np.mean(qber_values)
+        std_qber = np.std(qber_values)
+        avg_sift = np.mean(sift_efficiencies)
+        security_rate = secure_count / trials_per_rate
+        
+        analysis = {
+            'noise_rate': noise_rate,
+            'trials': trials_per_rate,
+            'avg_qber': avg_qber,
+            'std_qber': std_qber,
+            'avg_sift_efficiency': avg_sift,
+            'theoretical_qber': noise_rate * 0.25,
+            'secure_trials': secure_count,
+            'security_rate': security_rate
+        }
+        
+        self.results.append(analysis)
+        logger.info(f"  Results: QBER={avg_qber:.4f}±{std_qber:.4f}, Secure={security_rate:.0%}\n")
 
 
 def main():
@@ -0,0 +1,156 @@
+"""
+Sifting / QBER / privacy amplification kernels for the QuNetSim BB84 simulation
+===============================================================================
+
+For very large key lengths the NumPy path of steps 4-5 is bound by its
+temporaries (basis-match mask, two masked gathers, the comparison array for
+the error count). When Numba is installed and the input is large enough,
+these run as parallel kernels instead:
+
+- sift_keys: tiles count their matching bases in parallel, a prefix sum over
+  the tile counts gives each tile its write offset, and a second parallel
+  pass compacts both sifted keys directly (no mask array, no gathers).
+- count_test_errors: parallel error count over the sampled test positions.
+
+Below JIT_MIN_QUBITS, or without Numba, sifting uses a NumPy mask and the
+error count runs SWAR-style on bits packed 64 per uint64 word: one XOR and
+AND per word, then a popcount, instead of one comparison per bit.
+
+toeplitz_pa hashes the final key with a random binary Toeplitz matrix. The
+m x n matrix-vector product over GF(2) is a linear convolution, so it runs
+in O((n + m) log(n + m)) through a real FFT instead of O(mn).
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add utils to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
+
+from qc_utils import pack_bits, popcount
+
+# Optional Numba for the fused parallel kernels
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Inputs smaller than this stay on NumPy, where thread start-up would dominate
+JIT_MIN_QUBITS = 1 << 17
+
+# Qubits per parallel tile in sift_keys
+SIFT_TILE = 1 << 14
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True, boundscheck=False)
+    def _sift_tiled(alice_bits, alice_bases, bob_bases, bob_results):
+        """Tiled count / prefix-sum / compact sifting of both keys."""
+        n = alice_bits.shape[0]
+        n_tiles = (n + SIFT_TILE - 1) // SIFT_TILE
+        
+        counts = np.zeros(n_tiles, dtype=np.int64)
+        for t in prange(n_tiles):
+            c = 0
+            for i in range(t * SIFT_TILE, min((t + 1) * SIFT_TILE, n)):
+                if alice_bases[i] == bob_bases[i]:
+                    c += 1
+            counts[t] = c
+        
+        offsets = np.zeros(n_tiles + 1, dtype=np.int64)
+        for t in range(n_tiles):
+            offsets[t + 1] = offsets[t] + counts[t]
+        
+        sifted_alice = np.empty(offsets[n_tiles], dtype=alice_bits.dtype)
+        sifted_bob = np.empty(offsets[n_tiles], dtype=bob_results.dtype)
+        for t in prange(n_tiles):
+            k = offsets[t]
+            for i in range(t * SIFT_TILE, min((t + 1) * SIFT_TILE, n)):
+                if alice_bases[i] == bob_bases[i]:
+                    sifted_alice[k] = alice_bits[i]
+                    sifted_bob[k] = bob_results[i]
+                    k += 1
+        
+        return sifted_alice, sifted_bob
+    
+    @njit(parallel=True, cache=True, boundscheck=False)
+    def _count_errors(sifted_alice, sifted_bob, test_indices):
+        """Parallel mismatch count over the test positions."""
+        errors = 0
+        for j in prange(test_indices.shape[0]):
+            i = test_indices[j]
+            if sifted_alice[i] != sifted_bob[i]:
+                errors += 1
+        return errors
+
+
+def sift_keys(alice_bits: np.ndarray, alice_bases: np.ndarray,
+              bob_bases: np.ndarray, bob_results: np.ndarray):
+    """
+    Keep the bits of both parties where their bases match.
+    
+    Returns:
+    --------
+    tuple : (sifted_key_alice, sifted_key_bob)
+    """
+    if NUMBA_AVAILABLE and len(alice_bits) >= JIT_MIN_QUBITS:
+        return _sift_tiled(alice_bits, alice_bases, bob_bases, bob_results)
+    
+    mask = alice_bases == bob_bases
+    return alice_bits[mask], bob_results[mask]
+
+
+def count_test_errors(sifted_alice: np.ndarray, sifted_bob: np.ndarray,
+                      test_indices: np.ndarray) -> int:
+    """
+    Count mismatches between the sifted keys at the test positions.
+    
+    Returns:
+    --------
+    int : Number of test positions where the keys differ
+    """
+    if NUMBA_AVAILABLE and len(test_indices) >= JIT_MIN_QUBITS:
+        return int(_count_errors(sifted_alice, sifted_bob, test_indices))
+    
+    test_mask = np.zeros(len(sifted_alice), dtype=bool)
+    test_mask[test_indices] = True
+    error_words = (pack_bits(sifted_alice) ^ pack_bits(sifted_bob)) & pack_bits(test_mask)
+    return popcount(error_words)
+
+
+def toeplitz_pa(sifted_bits: np.ndarray, seed_bits: np.ndarray, out_len: int) -> np.ndarray:
+    """
+    Privacy amplification by a random binary Toeplitz hash: y = T x mod 2.
+    
+    T is the out_len x n Toeplitz matrix with T[i, j] = seed_bits[i - j + n - 1],
+    so its first column and row are fixed by out_len + n - 1 seed bits. The
+    product is the middle of the linear convolution of seed_bits with x,
+    which a circular FFT convolution of length >= n + out_len - 1 gives
+    without wrap-around. Convolution sums are bounded by n, so float64
+    rounding is exact for any key this simulation produces.
+    
+    Parameters:
+    -----------
+    sifted_bits : np.ndarray
+        Key bits to compress (0/1, length n)
+    seed_bits : np.ndarray
+        Public random Toeplitz seed (0/1, length out_len + n - 1)
+    out_len : int
+        Length of the extracted key (m)
+        
+    Returns:
+    --------
+    np.ndarray : Extracted key, uint8 array of length out_len
+    """
+    n = len(sifted_bits)
+    if out_len <= 0 or n == 0:
+        return np.empty(0, dtype=np.uint8)
+    if len(seed_bits) != out_len + n - 1:
+        raise ValueError(f"Toeplitz seed needs {out_len + n - 1} bits, got {len(seed_bits)}")
+    
+    size = 1 << (len(seed_bits) - 1).bit_length()
+    spectrum = np.fft.rfft(seed_bits, size) * np.fft.rfft(sifted_bits, size)
+    conv = np.fft.irfft(spectrum, size)[n - 1:n - 1 + out_len]
+    return (np.rint(conv).astype(np.int64) & 1).astype(np.uint8)
@@ -38,56 +38,84 @@ For: Engineer Sameh Zaghloul & Engineer Ragda
 Date: 2026
 """
 
-import random
+import sys
+import multiprocessing
 import numpy as np
+from numpy.lib import recfunctions
+from dataclasses import dataclass
+from pathlib import Path
 from typing import List, Tuple, Dict
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Add utils to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
+
+from qc_utils import key_generator
+from _bb84_kernels import sift_keys, count_test_errors, toeplitz_pa
+from bb84_jit import bb84_one_shot
+
+# Per-step protocol logs are DEBUG; logging is configured only when run as a script
 logger = logging.getLogger(__name__)
 
+# Shared generator so consecutive trials draw from one PCG64 stream
+# (simulation randomness only: noise, measurement outcomes, test sampling)
+_RNG = np.random.default_rng()
+
+# Privacy amplification compresses the final key 4:1
+PA_COMPRESSION = 4
+
+# Per-trial result fields collected by run_multiple_trials, in column order
+TRIAL_STAT_COLUMNS = ('qber', 'key_rate', 'sifted_key_length', 'final_key_length')
 
-class QuantumBit:
+# Per-trial record layout for run_multiple_trials
+TRIAL_RECORD_DTYPE = np.dtype([
+    ('qber', 'f8'),
+    ('key_rate', 'f8'),
+    ('sifted_key_length', 'i8'),
+    ('final_key_length', 'i8'),
+    ('eavesdropper_detected', '?')
+])
+
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10+
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**DATACLASS_SLOTS)
+class BB84Result:
     """
-    Represents a quantum bit in QuNetSim simulation.
+    Outcome of one BB84Protocol.execute run.
     
-    Attributes:
-    -----------
-    bit_value : int
-        Classical bit value (0 or 1)
-    basis : int
-        Measurement basis (0 = Rectilinear/Z, 1 = Diagonal/X)
+    Also readable like the dict execute() used to return (result['qber'],
+    keys(), get(), dict(result)).
     """
+    success: bool
+    qubits_transmitted: int
+    sifted_key_length: int
+    final_key_length: int
+    amplified_key_length: int
+    qber: float
+    eavesdropper_detected: bool
+    key_rate: float
     
-    def __init__(self, bit_value: int, basis: int):
-        self.bit_value = bit_value
-        self.basis = basis
+    def to_dict(self) -> Dict:
+        """Result as the plain dict execute() used to return."""
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
     
-    def measure(self, measurement_basis: int, noise_rate: float = 0.0) -> int:
-        """
-        Measure the quantum bit with potential noise.
-        
-        Parameters:
-        -----------
-        measurement_basis : int
-            Basis for measurement
-        noise_rate : float
-            Probability of measurement error
-            
-        Returns:
-        --------
-        int : Measurement result (0 or 1)
-        """
-        if measurement_basis == self.basis:
-            # Correct basis - get correct result with probability (1 - noise_rate)
-            if random.random() < noise_rate:
-                return 1 - self.bit_value
-            else:
-                return self.bit_value
-        else:
-            # Wrong basis - random result
-            return random.randint(0, 1)
+    def keys(self):
+        """Field names, in the order of the old result dict."""
+        return self.__dataclass_fields__.keys()
+    
+    def __getitem__(self, key):
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key):
+        return key in self.__dataclass_fields__
+    
+    def get(self, key, default=None):
+        """Field value, or default for names that are not fields."""
+        return self[key] if key in self else default
 
 
 class BB84Protocol:
@@ -100,73 +128,75 @@ class BB84Protocol:
         Desired length of quantum key to transmit
     noise_rate : float
         Quantum channel noise rate (0.0 to 1.0)
+    rng : np.random.Generator, optional
+        Simulation random generator for noise, measurement outcomes and
+        test sampling (default: shared module-level generator)
+    key_rng : np.random.Generator, optional
+        Generator for bits and bases (default: shared key generator)
     """
     
-    def __init__(self, key_length: int = 1000, noise_rate: float = 0.01):
+    def __init__(self, key_length: int = 1000, noise_rate: float = 0.01,
+                 rng: np.random.Generator = None, key_rng: np.random.Generator = None):
         self.key_length = key_length
         self.noise_rate = noise_rate
+        self._sim_rng = rng if rng is not None else _RNG
+        self._key_rng = key_generator(key_rng)
         
-        # Protocol data
-        self.alice_bits = []
-        self.alice_bases = []
-        self.bob_bases = []
-        self.bob_results = []
-        self.quantum_bits = []
+        # Protocol data (bits and bases as uint8 arrays, one entry per qubit)
+        self.alice_bits = np.empty(0, dtype=np.uint8)
+        self.alice_bases = np.empty(0, dtype=np.uint8)
+        self.bob_bases = np.empty(0, dtype=np.uint8)
+        self.bob_results = np.empty(0, dtype=np.uint8)
         
         # Results
-        self.sifted_key_alice = []
-        self.sifted_key_bob = []
+        self.sifted_key_alice = np.empty(0, dtype=np.uint8)
+        self.sifted_key_bob = np.empty(0, dtype=np.uint8)
         self.eavesdropper_detected = False
         self.qber = 0.0
+        self.amplified_key = np.empty(0, dtype=np.uint8)
     
     def step1_alice_prepares_bits(self):
         """Step 1: Alice generates random bits and bases."""
-        logger.info("Step 1: Alice prepares random bits and bases")
+        logger.debug("Step 1: Alice prepares random bits and bases")
         
-        self.alice_bits = [random.randint(0, 1) for _ in range(self.key_length)]
-        self.alice_bases = [random.randint(0, 1) for _ in range(self.key_length)]
+        self.alice_bits = self._key_rng.integers(0, 2, size=self.key_length, dtype=np.uint8)
+        self.alice_bases = self._key_rng.integers(0, 2, size=self.key_length, dtype=np.uint8)
         
-        # Create quantum bits
-        self.quantum_bits = [
-            QuantumBit(bit, basis)
-            for bit, basis in zip(self.alice_bits, self.alice_bases)
-        ]
-        
-        logger.info(f"  Generated {self.key_length} quantum bits")
+        logger.debug("  Generated %d quantum bits", self.key_length)
     
     def step2_bob_chooses_bases(self):
         """Step 2: Bob randomly chooses measurement bases."""
-        logger.info("Step 2: Bob randomly chooses measurement bases")
+        logger.debug("Step 2: Bob randomly chooses measurement bases")
         
-        self.bob_bases = [random.randint(0, 1) for _ in range(self.key_length)]
-        logger.info(f"  Generated {self.key_length} measurement bases")
+        self.bob_bases = self._key_rng.integers(0, 2, size=self.key_length, dtype=np.uint8)
+        logger.debug("  Generated %d measurement bases", self.key_length)
     
     def step3_bob_measures_qubits(self):
         """Step 3: Bob measures received quantum bits."""
-        logger.info("Step 3: Bob measures quantum bits")
+        logger.debug("Step 3: Bob measures quantum bits")
         
-        self.bob_results = [
-            qbit.measure(basis, self.noise_rate)
-            for qbit, basis in zip(self.quantum_bits, self.bob_bases)
-        ]
+        # Matching basis: correct result unless noise flips it;
+        # wrong basis: random result
+        matching = self.alice_bases == self.bob_bases
+        noise = self._sim_rng.random(self.key_length) < self.noise_rate
+        random_bits = self._sim_rng.integers(0, 2, size=self.key_length, dtype=np.uint8)
+        measured = np.bitwise_xor(self.alice_bits, noise.astype(np.uint8))
+        self.bob_results = np.where(matching, measured, random_bits)
         
-        logger.info(f"  Completed {self.key_length} measurements")
+        logger.debug("  Completed %d measurements", self.key_length)
     
     def step4_basis_reconciliation(self):
         """Step 4: Alice and Bob publicly compare bases (sifting)."""
-        logger.info("Step 4: Basis reconciliation (sifting)")
-        
-        self.sifted_key_alice = []
-        self.sifted_key_bob = []
+        logger.debug("Step 4: Basis reconciliation (sifting)")
         
-        for i in range(self.key_length):
-            if self.alice_bases[i] == self.bob_bases[i]:
-                self.sifted_key_alice.append(self.alice_bits[i])
-                self.sifted_key_bob.append(self.bob_results[i])
+        self.sifted_key_alice, self.sifted_key_bob = sift_keys(
+            self.alice_bits, self.alice_bases, self.bob_bases, self.bob_results
+        )
         
         sifted_length = len(self.sifted_key_alice)
-        logger.info(f"  Sifted key length: {sifted_length}")
-        logger.info(f"  Sift efficiency: {sifted_length / self.key_length:.2%}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("  Sifted key length: %d", sifted_length)
+            logger.debug("  Sift efficiency: %.2f%%", 100 * sifted_length / self.key_length)
     
     def step5_eavesdropper_check(self, error_threshold: float = 0.11) -> bool:
         """
@@ -181,7 +211,7 @@ class BB84Protocol:
         --------
         bool : True if eavesdropping suspected, False otherwise
         """
-        logger.info("Step 5: Eavesdropping detection via QBER")
+        logger.debug("Step 5: Eavesdropping detection via QBER")
         
         if len(self.sifted_key_alice) == 0:
             logger.warning("  No sifted key - cannot perform QBER test")
@@ -189,30 +219,48 @@ class BB84Protocol:
         
         # Calculate QBER on a subset of sifted key
         test_ratio = 0.5  # Use 50% of sifted key for testing
-        test_indices = random.sample(
-            range(len(self.sifted_key_alice)),
-            max(1, int(len(self.sifted_key_alice) * test_ratio))
-        )
+        sifted_length = len(self.sifted_key_alice)
+        test_size = max(1, int(sifted_length * test_ratio))
+        test_indices = self._sim_rng.choice(sifted_length, size=test_size, replace=False)
         
-        errors = sum(
-            1 for i in test_indices
-            if self.sifted_key_alice[i] != self.sifted_key_bob[i]
-        )
+        errors = count_test_errors(self.sifted_key_alice, self.sifted_key_bob, test_indices)
         
-        self.qber = errors / len(test_indices) if test_indices else 0.0
+        self.qber = errors / test_size
         
-        logger.info(f"  QBER: {self.qber:.6f}")
-        logger.info(f"  Threshold: {error_threshold:.6f}")
+        logger.debug("  QBER: %.6f (threshold %.6f)", self.qber, error_threshold)
         
         if self.qber > error_threshold:
             logger.warning("  EAVESDROPPING DETECTED - Aborting protocol")
             self.eavesdropper_detected = True
             return True
         else:
-            logger.info("  No eavesdropping detected")
+            logger.debug("  No eavesdropping detected")
             return False
     
-    def execute(self, error_threshold: float = 0.11) -> Dict:
+    def privacy_amplification(self, final_key: np.ndarray) -> np.ndarray:
+        """
+        Compress the final key PA_COMPRESSION:1 with a random Toeplitz hash.
+        
+        The Toeplitz seed is public randomness drawn from the protocol's
+        generator; Alice and Bob apply the same hash to their keys.
+        
+        Parameters:
+        -----------
+        final_key : np.ndarray
+            Key bits left after sifting and the QBER test
+            
+        Returns:
+        --------
+        np.ndarray : Privacy-amplified key
+        """
+        out_len = len(final_key) // PA_COMPRESSION
+        if out_len == 0:
+            return np.empty(0, dtype=np.uint8)
+        
+        seed_bits = self._sim_rng.integers(0, 2, size=out_len + len(final_key) - 1, dtype=np.uint8)
+        return toeplitz_pa(final_key, seed_bits, out_len)
+    
+    def execute(self, error_threshold: float = 0.11) -> BB84Result:
         """
         Execute complete BB84 protocol.
         
@@ -223,11 +271,9 @@ class BB84Protocol:
             
         Returns:
         --------
-        dict : Protocol results
+        BB84Result : Protocol results
         """
-        logger.info("\n" + "="*60)
-        logger.info("EXECUTING BB84 PROTOCOL")
-        logger.info("="*60 + "\n")
+        logger.debug("Executing BB84 protocol (%d qubits)", self.key_length)
         
         # Execute protocol steps
         self.step1_alice_prepares_bits()
@@ -243,27 +289,75 @@ class BB84Protocol:
         else:
             final_key = []
         
-        results = {
-            'success': not eavesdropper_detected,
-            'qubits_transmitted': self.key_length,
-            'sifted_key_length': len(self.sifted_key_alice),
-            'final_key_length': len(final_key),
-            'qber': self.qber,
-            'eavesdropper_detected': eavesdropper_detected,
-            'key_rate': len(final_key) / self.key_length if self.key_length > 0 else 0
-        }
+        # Privacy amplification (after the QBER check passed)
+        self.amplified_key = self.privacy_amplification(np.asarray(final_key, dtype=np.uint8))
+        
+        results = BB84Result(
+            success=not eavesdropper_detected,
+            qubits_transmitted=self.key_length,
+            sifted_key_length=len(self.sifted_key_alice),
+            final_key_length=len(final_key),
+            amplified_key_length=len(self.amplified_key),
+            qber=self.qber,
+            eavesdropper_detected=eavesdropper_detected,
+            key_rate=len(final_key) / self.key_length if self.key_length > 0 else 0
+        )
+        
+        logger.info("BB84 trial: sifted %d/%d, QBER %.4f, final key %d bits%s",
+                    results.sifted_key_length, self.key_length, self.qber,
+                    results.final_key_length,
+                    " (eavesdropper detected)" if eavesdropper_detected else "")
         
         return results
 
 
+def _run_trial(key_length: int, noise_rate: float,
+               seed: np.random.SeedSequence, seeded: bool) -> Tuple:
+    """
+    Run one independent BB84 trial in a worker process.
+    
+    Module-level so it can be dispatched to a process pool; only the
+    TRIAL_RECORD_DTYPE scalars are sent back, never the keys.
+    
+    Parameters:
+    -----------
+    key_length : int
+        Quantum key length for the trial
+    noise_rate : float
+        Quantum channel noise rate
+    seed : np.random.SeedSequence
+        Seed for the trial's simulation generator
+    seeded : bool
+        Draw key bits and bases from that generator too (reproducible
+        sweeps); otherwise they come from the shared key generator
+        
+    Returns:
+    --------
+    tuple : One TRIAL_RECORD_DTYPE record
+    """
+    rng = np.random.default_rng(seed)
+    protocol = BB84Protocol(key_length=key_length, noise_rate=noise_rate,
+                            rng=rng, key_rng=rng if seeded else None)
+    result = protocol.execute()
+    return (result.qber, result.key_rate, result.sifted_key_length,
+            result.final_key_length, result.eavesdropper_detected)
+
+
 def run_multiple_trials(
     num_trials: int = 10,
     key_length: int = 1000,
-    noise_rate: float = 0.01
+    noise_rate: float = 0.01,
+    seed: int = None,
+    processes: int = 1
 ) -> Dict:
     """
     Run multiple BB84 protocol trials.
     
+    With processes other than 1 the trials, which share no state, run on a
+    process pool, each with its own generator spawned from the root seed.
+    Worth it for long keys or many trials; a seeded pool run is
+    reproducible but draws different streams than a sequential one.
+    
     Parameters:
     -----------
     num_trials : int
@@ -272,6 +366,12 @@ def run_multiple_trials(
         Quantum key length per trial
     noise_rate : float
         Quantum channel noise rate
+    seed : int, optional
+        Seed for reproducible trials. When given, key bits and bases are
+        drawn from the seeded generator too (default: shared simulation
+        generator and shared key generator)
+    processes : int, optional
+        Worker processes (1 to run in this process, None for one per CPU)
         
     Returns:
     --------
@@ -281,48 +381,198 @@ def run_multiple_trials(
     logger.info(f"RUNNING {num_trials} BB84 PROTOCOL TRIALS")
     logger.info(f"{'='*60}\n")
     
-    successful_trials = 0
-    eavesdropper_detections = 0
-    qber_values = []
-    key_rate_values = []
-    sifted_lengths = []
-    final_key_lengths = []
+    # One record per trial
+    records = np.recarray(num_trials, dtype=TRIAL_RECORD_DTYPE)
     
-    for trial_num in range(num_trials):
-        logger.info(f"\n>>> TRIAL {trial_num + 1}/{num_trials} <<<\n")
-        
-        protocol = BB84Protocol(key_length=key_length, noise_rate=noise_rate)
-        result = protocol.execute()
+    if processes == 1:
+        rng = np.random.default_rng(seed) if seed is not None else _RNG
+        key_rng = rng if seed is not None else None
         
-        if result['success']:
-            successful_trials += 1
+        for trial_num in range(num_trials):
+            logger.debug("Trial %d/%d", trial_num + 1, num_trials)
+            
+            protocol = BB84Protocol(key_length=key_length, noise_rate=noise_rate,
+                                    rng=rng, key_rng=key_rng)
+            result = protocol.execute()
+            
+            records[trial_num] = (result.qber, result.key_rate, result.sifted_key_length,
+                                  result.final_key_length, result.eavesdropper_detected)
+    else:
+        trial_seeds = np.random.SeedSequence(seed).spawn(num_trials)
+        # Spawned (not forked) workers: Numba's threading layer is not fork-safe
+        with multiprocessing.get_context('spawn').Pool(processes) as pool:
+            outcomes = pool.starmap(_run_trial, [(key_length, noise_rate, s, seed is not None)
+                                                 for s in trial_seeds])
+        records[:] = outcomes
+    
+    stats = recfunctions.structured_to_unstructured(
+        records[list(TRIAL_STAT_COLUMNS)], dtype=np.float64
+    )
+    return _trial_statistics(stats, records.eavesdropper_detected, key_length, noise_rate)
+
+
+def run_batched_trials(
+    num_trials: int = 10,
+    key_length: int = 1000,
+    noise_rate: float = 0.01,
+    error_threshold: float = 0.11,
+    seed: int = None
+) -> Dict:
+    """
+    Run multiple BB84 protocol trials as one vectorized pass.
+    
+    Same protocol and statistics as run_multiple_trials, but every step
+    operates on (num_trials, key_length) arrays, so the NumPy dispatch
+    cost is paid once per batch rather than once per trial.
+    
+    Parameters:
+    -----------
+    num_trials : int
+        Number of protocol executions
+    key_length : int
+        Quantum key length per trial
+    noise_rate : float
+        Quantum channel noise rate
+    error_threshold : float
+        QBER threshold for eavesdropping detection
+    seed : int, optional
+        Seed for reproducible trials (default: shared module-level generator)
         
-        if result['eavesdropper_detected']:
-            eavesdropper_detections += 1
+    Returns:
+    --------
+    dict : Aggregate statistics
+    """
+    logger.info(f"Running {num_trials} batched BB84 trials ({key_length} qubits each)")
+    
+    rng = np.random.default_rng(seed) if seed is not None else _RNG
+    shape = (num_trials, key_length)
+    
+    # Steps 1-2: bits and bases for every trial at once, as the rows of one
+    # contiguous (3, num_trials, key_length) tensor (a single allocation)
+    alice_bits, alice_bases, bob_bases = rng.integers(0, 2, size=(3,) + shape, dtype=np.uint8)
+    
+    # Step 3: matching basis -> noisy copy of Alice's bit, otherwise random
+    matching = alice_bases == bob_bases
+    noise = rng.random(shape) < noise_rate
+    random_bits = rng.integers(0, 2, size=shape, dtype=np.uint8)
+    bob_results = np.where(matching, alice_bits ^ noise.astype(np.uint8), random_bits)
+    
+    # Step 4: per-trial sifted length
+    sifted_lengths = np.count_nonzero(matching, axis=1)
+    
+    # Step 5: test a uniformly random half of each sifted key. Ranking random
+    # priorities (non-sifted positions last) and taking the first test_size
+    # per row samples without replacement, like rng.choice in step5.
+    test_sizes = np.maximum(1, (sifted_lengths * 0.5).astype(np.int64))
+    priorities = rng.random(shape)
+    priorities[~matching] = np.inf
+    order = np.argsort(priorities, axis=1)
+    errors = np.take_along_axis(matching & (alice_bits != bob_results), order, axis=1)
+    error_counts = np.cumsum(errors, axis=1)[np.arange(num_trials), test_sizes - 1]
+    
+    has_key = sifted_lengths > 0
+    qber_values = np.where(has_key, error_counts / test_sizes, 0.0)
+    eavesdropper_flags = has_key & (qber_values > error_threshold)
+    final_key_lengths = np.where(has_key & ~eavesdropper_flags, sifted_lengths // 2, 0)
+    
+    key_rate_values = final_key_lengths / key_length if key_length > 0 else np.zeros(num_trials)
+    stats = np.column_stack([qber_values, key_rate_values, sifted_lengths, final_key_lengths])
+    
+    return _trial_statistics(stats, eavesdropper_flags, key_length, noise_rate)
+
+
+def run_one_shot_trials(
+    num_trials: int = 10,
+    key_length: int = 10_000_000,
+    noise_rate: float = 0.01,
+    error_threshold: float = 0.11,
+    seed: int = None,
+    eavesdropped: bool = False
+) -> Dict:
+    """
+    Run multiple BB84 trials through the fused packed-bit kernel.
+    
+    Meant for very large key lengths: each trial is one bb84_one_shot call
+    that only returns the sifted length and its error count, so the QBER is
+    measured on the whole sifted key rather than a sampled half.
+    
+    Parameters:
+    -----------
+    num_trials : int
+        Number of protocol executions
+    key_length : int
+        Quantum key length per trial
+    noise_rate : float
+        Quantum channel noise rate
+    error_threshold : float
+        QBER threshold for eavesdropping detection
+    seed : int, optional
+        Seed for reproducible trials (default: OS entropy)
+    eavesdropped : bool
+        Simulate an intercept-resend eavesdropper on every qubit
         
-        qber_values.append(result['qber'])
-        key_rate_values.append(result['key_rate'])
-        sifted_lengths.append(result['sifted_key_length'])
-        final_key_lengths.append(result['final_key_length'])
+    Returns:
+    --------
+    dict : Aggregate statistics
+    """
+    logger.info(f"Running {num_trials} one-shot BB84 trials ({key_length} qubits each)")
+    
+    trial_seeds = np.random.SeedSequence(seed).generate_state(num_trials, dtype=np.uint64)
+    
+    sifted_lengths = np.empty(num_trials, dtype=np.int64)
+    error_counts = np.empty(num_trials, dtype=np.int64)
+    for trial_num, trial_seed in enumerate(trial_seeds):
+        sifted_lengths[trial_num], error_counts[trial_num] = bb84_one_shot(
+            key_length, noise_rate, int(trial_seed), eavesdropped
+        )
     
-    # Calculate statistics
-    statistics = {
+    has_key = sifted_lengths > 0
+    qber_values = np.where(has_key, error_counts / np.maximum(sifted_lengths, 1), 0.0)
+    eavesdropper_flags = has_key & (qber_values > error_threshold)
+    final_key_lengths = np.where(has_key & ~eavesdropper_flags, sifted_lengths // 2, 0)
+    
+    key_rate_values = final_key_lengths / key_length if key_length > 0 else np.zeros(num_trials)
+    stats = np.column_stack([qber_values, key_rate_values, sifted_lengths, final_key_lengths])
+    
+    return _trial_statistics(stats, eavesdropper_flags, key_length, noise_rate)
+
+
+def _trial_statistics(
+    stats: np.ndarray,
+    eavesdropper_flags: np.ndarray,
+    key_length: int,
+    noise_rate: float
+) -> Dict:
+    """
+    Aggregate a (num_trials, 4) per-trial array (columns as in
+    TRIAL_STAT_COLUMNS) into the run_multiple_trials statistics dict.
+    """
+    num_trials = len(stats)
+    detections = int(eavesdropper_flags.sum())
+    successful_trials = num_trials - detections
+    
+    # All column reductions in one pass each
+    means = stats.mean(axis=0)
+    stds = stats.std(axis=0)
+    mins = stats.min(axis=0)
+    maxs = stats.max(axis=0)
+    qber, key_rate, sifted, final = range(len(TRIAL_STAT_COLUMNS))
+    
+    return {
         'num_trials': num_trials,
         'successful_trials': successful_trials,
         'success_rate': successful_trials / num_trials if num_trials > 0 else 0,
-        'eavesdropper_detections': eavesdropper_detections,
-        'avg_qber': np.mean(qber_values),
-        'std_qber': np.std(qber_values),
-        'min_qber': np.min(qber_values),
-        'max_qber': np.max(qber_values),
-        'avg_sifted_key_length': np.mean(sifted_lengths),
-        'avg_final_key_length': np.mean(final_key_lengths),
-        'avg_key_rate': np.mean(key_rate_values),
+        'eavesdropper_detections': detections,
+        'avg_qber': means[qber],
+        'std_qber': stds[qber],
+        'min_qber': mins[qber],
+        'max_qber': maxs[qber],
+        'avg_sifted_key_length': means[sifted],
+        'avg_final_key_length': means[final],
+        'avg_key_rate': means[key_rate],
         'noise_rate': noise_rate,
         'key_length_per_trial': key_length
     }
-    
-    return statistics
 
 
 def main():
@@ -334,7 +584,7 @@ def main():
     noise_rate = 0.01
     
     # Run simulations
-    statistics = run_multiple_trials(
+    statistics = run_batched_trials(
         num_trials=num_trials,
         key_length=key_length,
         noise_rate=noise_rate
@@ -366,4 +616,5 @@ def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     statistics = main()
@@ -42,36 +42,54 @@ For: Engineer Sameh Zaghloul & Engineer Ragda
 Date: 2026
 """
 
+import sys
+import time
 import numpy as np
 import logging
 from datetime import datetime
-from collections import defaultdict
+from pathlib import Path
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Add utils to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'utils'))
+
+from qc_utils import key_generator, count_bit_errors
+
+# Per-step protocol logs are DEBUG; logging is configured only when run as a script
 logger = logging.getLogger(__name__)
 
+# Shared generator so protocol runs and trials draw from one PCG64 stream
+# (simulation randomness only: channel loss, measurement outcomes)
+_RNG = np.random.default_rng()
+
+# Per-channel record in QuantumNetworkSimulator._edge_stats
+CHANNEL_DTYPE = np.dtype([
+    ('loss_rate', 'f8'),
+    ('delay', 'f8'),
+    ('qubit_count', 'i8'),
+    ('error_count', 'i8')
+])
 
 class QuantumNetworkSimulator:
     """QuNetSim-based Quantum Network Simulator"""
     
-    def __init__(self, network_name="QKD_Network", node_count=2):
+    def __init__(self, network_name="QKD_Network", node_count=2, rng=None):
         """
         Initialize quantum network simulator
         
         Args:
             network_name (str): Name of the network
             node_count (int): Number of nodes in network
+            rng (np.random.Generator): Random generator (default: shared module generator)
         """
         self.network_name = network_name
         self.node_count = node_count
+        self._rng = rng if rng is not None else _RNG
         self.nodes = {}
-        self.channels = defaultdict(dict)
-        self.timestamp = datetime.now()
-        logger.info(f"Initialized {network_name} with {node_count} nodes")
+        # Channel table: (from_node, to_node) -> row of a CHANNEL_DTYPE array
+        self._edge_index = {}
+        self._edge_stats = np.zeros(4, dtype=CHANNEL_DTYPE)
+        self.t0_ns = time.perf_counter_ns()
+        logger.debug("Initialized %s with %d nodes", network_name, node_count)
     
     def add_node(self, node_id, node_name):
         """
@@ -87,25 +105,33 @@ class QuantumNetworkSimulator:
             'qubits': [],
             'classical_data': []
         }
-        logger.info(f"Added node {node_id}: {node_name}")
+        logger.debug("Added node %s: %s", node_id, node_name)
     
     def add_quantum_channel(self, from_node, to_node, loss_rate=0.0, delay=0.0):
         """
         Add quantum channel between nodes
         
+        Re-adding an existing channel reuses its row, replacing the loss rate
+        and delay and resetting its counters.
+        
         Args:
             from_node (int): Source node ID
             to_node (int): Destination node ID
             loss_rate (float): Quantum loss probability (0.0-1.0)
             delay (float): Channel delay in milliseconds
         """
-        self.channels[from_node][to_node] = {
-            'loss_rate': loss_rate,
-            'delay': delay,
-            'qubit_count': 0,
-            'error_count': 0
-        }
-        logger.info(f"Added channel {from_node}→{to_node}: loss={loss_rate:.4f}, delay={delay}ms")
+        edge = (from_node, to_node)
+        row = self._edge_index.get(edge)
+        if row is None:
+            row = len(self._edge_index)
+            if row == len(self._edge_stats):
+                grown = np.zeros(2 * row, dtype=CHANNEL_DTYPE)
+                grown[:row] = self._edge_stats
+                self._edge_stats = grown
+            self._edge_index[edge] = row
+        
+        self._edge_stats[row] = (loss_rate, delay, 0, 0)
+        logger.debug("Added channel %s→%s: loss=%.4f, delay=%sms", from_node, to_node, loss_rate, delay)
     
     def transmit_qubits(self, from_node, to_node, qubits):
         """
@@ -119,23 +145,20 @@ class QuantumNetworkSimulator:
         Returns:
             np.array: Received qubits (possibly with errors)
         """
-        if from_node not in self.channels or to_node not in self.channels[from_node]:
+        row = self._edge_index.get((from_node, to_node))
+        if row is None:
             logger.warning(f"No channel from {from_node} to {to_node}")
             return None
         
-        channel = self.channels[from_node][to_node]
-        received_qubits = qubits.copy()
+        # Simulate loss: each qubit survives independently with 1 - loss_rate
+        keep = self._rng.random(len(qubits)) >= self._edge_stats['loss_rate'][row]
+        received_qubits = qubits[keep]
+        loss_count = len(qubits) - int(keep.sum())
         
-        # Simulate loss
-        loss_count = np.random.binomial(len(received_qubits), channel['loss_rate'])
-        if loss_count > 0:
-            loss_positions = np.random.choice(len(received_qubits), loss_count, replace=False)
-            received_qubits = np.delete(received_qubits, loss_positions)
+        self._edge_stats['qubit_count'][row] += len(qubits)
+        self._edge_stats['error_count'][row] += loss_count
         
-        channel['qubit_count'] += len(qubits)
-        channel['error_count'] += loss_count
-        
-        logger.info(f"Transmitted {len(qubits)} qubits from {from_node} to {to_node}, lost {loss_count}")
+        logger.debug("Transmitted %d qubits from %s to %s, lost %d", len(qubits), from_node, to_node, loss_count)
         return received_qubits
     
     def get_channel_stats(self, from_node, to_node):
@@ -149,27 +172,31 @@ class QuantumNetworkSimulator:
         Returns:
             dict: Channel statistics
         """
-        if from_node not in self.channels or to_node not in self.channels[from_node]:
+        row = self._edge_index.get((from_node, to_node))
+        if row is None:
             return None
         
-        channel = self.channels[from_node][to_node]
-        success_rate = 1.0 - (channel['error_count'] / channel['qubit_count']) if channel['qubit_count'] > 0 else 1.0
+        channel = self._edge_stats[row]
+        qubit_count = int(channel['qubit_count'])
+        error_count = int(channel['error_count'])
+        success_rate = 1.0 - (error_count / qubit_count) if qubit_count > 0 else 1.0
         
         return {
             'from_node': from_node,
             'to_node': to_node,
-            'qubits_transmitted': channel['qubit_count'],
-            'qubits_lost': channel['error_count'],
+            'qubits_transmitted': qubit_count,
+            'qubits_lost': error_count,
             'success_rate': success_rate,
-            'loss_rate': channel['loss_rate'],
-            'delay': channel['delay']
+            'loss_rate': float(channel['loss_rate']),
+            'delay': float(channel['delay'])
         }
 
 
 class BB84QuNetSim:
     """BB84 Protocol Implementation using QuNetSim"""
     
-    def __init__(self, alice_node=0, bob_node=1, network=None):
+    def __init__(self, alice_node=0, bob_node=1, network=None, rng=None, verbose=False,
+                 key_rng=None):
         """
         Initialize BB84 protocol with network
         
@@ -177,12 +204,21 @@ class BB84QuNetSim:
             alice_node (int): Alice's node ID
             bob_node (int): Bob's node ID
             network (QuantumNetworkSimulator): Quantum network instance
+            rng (np.random.Generator): Simulation random generator (default: shared module generator)
+            verbose (bool): Keep full bit/basis arrays in protocol_log (debugging)
+            key_rng (np.random.Generator): Generator for bits and bases (default: shared key generator)
         """
         self.alice_node = alice_node
         self.bob_node = bob_node
         self.network = network
         self.protocol_log = []
-        logger.info(f"Initialized BB84 protocol: Alice={alice_node}, Bob={bob_node}")
+        self.verbose = verbose
+        # Batch wall-clock label (ISO string), set once by the caller
+        self.timestamp = None
+        self.t0_ns = 0
+        self._sim_rng = rng if rng is not None else _RNG
+        self._key_rng = key_generator(key_rng)
+        logger.debug("Initialized BB84 protocol: Alice=%s, Bob=%s", alice_node, bob_node)
     
     def alice_encode_bases(self, n_qubits):
         """
@@ -194,17 +230,22 @@ class BB84QuNetSim:
         Returns:
             tuple: (bits, bases)
         """
-        bits = np.random.randint(0, 2, n_qubits)
-        bases = np.random.randint(0, 2, n_qubits)
+        bits = self._key_rng.integers(0, 2, n_qubits, dtype=np.uint8)
+        bases = self._key_rng.integers(0, 2, n_qubits, dtype=np.uint8)
         
         log_entry = {
             'step': 'Alice Encoding',
             'n_qubits': n_qubits,
-            'bases_used': bases,
-            'bits_encoded': bits
+            'bases_popcount': int(bases.sum()),
+            'bases_head': bases[:16].tolist(),
+            'bits_popcount': int(bits.sum()),
+            'bits_head': bits[:16].tolist()
         }
+        if self.verbose:
+            log_entry['bases_used'] = bases
+            log_entry['bits_encoded'] = bits
         self.protocol_log.append(log_entry)
-        logger.info(f"Alice encoded {n_qubits} qubits with random bases")
+        logger.debug("Alice encoded %d qubits with random bases", n_qubits)
         
         return bits, bases
     
@@ -218,15 +259,18 @@ class BB84QuNetSim:
         Returns:
             np.array: Random bases for measurement
         """
-        bases = np.random.randint(0, 2, n_qubits)
+        bases = self._key_rng.integers(0, 2, n_qubits, dtype=np.uint8)
         
         log_entry = {
             'step': 'Bob Measurement Basis Selection',
             'n_qubits': n_qubits,
-            'bases_chosen': bases
+            'bases_popcount': int(bases.sum()),
+            'bases_head': bases[:16].tolist()
         }
+        if self.verbose:
+            log_entry['bases_chosen'] = bases
         self.protocol_log.append(log_entry)
-        logger.info(f"Bob selected random measurement bases for {n_qubits} qubits")
+        logger.debug("Bob selected random measurement bases for %d qubits", n_qubits)
         
         return bases
     
@@ -251,7 +295,7 @@ class BB84QuNetSim:
             'sift_efficiency': len(matching_indices) / len(alice_bases) if len(alice_bases) > 0 else 0
         }
         self.protocol_log.append(log_entry)
-        logger.info(f"Sifting: {len(matching_indices)} matching bases out of {len(alice_bases)}")
+        logger.debug("Sifting: %d matching bases out of %d", len(matching_indices), len(alice_bases))
         
         return matching_indices
     
@@ -273,19 +317,19 @@ class BB84QuNetSim:
         if test_size > len(alice_key):
             test_size = len(alice_key)
         
-        test_indices = np.random.choice(len(alice_key), test_size, replace=False)
-        alice_test = alice_key[test_indices]
-        bob_test = bob_key[test_indices]
+        # Sifted bits and their errors are i.i.d. in position, so the leading
+        # test_size bits are as good a sample as a random subset
+        alice_test = alice_key[:test_size]
+        bob_test = bob_key[:test_size]
         
-        errors = np.sum(alice_test != bob_test)
+        errors = count_bit_errors(alice_test, bob_test)
         error_rate = errors / test_size if test_size > 0 else 0
         
         # Theoretical error rate should be ~0.25 if no eavesdropping
         # Error rate > ~0.06 indicates likely eavesdropping
         eavesdropper_detected = error_rate > 0.06
         
-        final_key_indices = np.delete(np.arange(len(alice_key)), test_indices)
-        final_key = alice_key[final_key_indices]
+        final_key = alice_key[test_size:]
         
         result = {
             'test_bits': test_size,
@@ -305,8 +349,9 @@ class BB84QuNetSim:
         }
         self.protocol_log.append(log_entry)
         
-        status = "DETECTED" if eavesdropper_detected else "NOT DETECTED"
-        logger.info(f"Eavesdropping check: {status} (error rate: {error_rate:.4f})")
+        if logger.isEnabledFor(logging.DEBUG):
+            status = "DETECTED" if eavesdropper_detected else "NOT DETECTED"
+            logger.debug("Eavesdropping check: %s (error rate: %.4f)", status, error_rate)
         
         return result
     
@@ -320,11 +365,14 @@ class BB84QuNetSim:
         Returns:
             dict: Protocol results
         """
-        logger.info(f"\n{'='*70}")
-        logger.info(f"BB84 Protocol Execution - {self.timestamp}")
-        logger.info(f"Network: {self.network.network_name if self.network else 'Direct'}")
-        logger.info(f"Qubits: {n_qubits}")
-        logger.info(f"{'='*70}\n")
+        self.t0_ns = time.perf_counter_ns()
+        if self.timestamp is None:
+            self.timestamp = datetime.now().isoformat()
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("BB84 Protocol Execution - %s", self.timestamp)
+            logger.debug("Network: %s, Qubits: %d",
+                         self.network.network_name if self.network else 'Direct', n_qubits)
         
         # Step 1: Alice encodes
         alice_bits, alice_bases = self.alice_encode_bases(n_qubits)
@@ -333,14 +381,12 @@ class BB84QuNetSim:
         bob_bases = self.bob_choose_bases(n_qubits)
         
         # Step 3: Simulate measurements (with proper basis agreement)
-        bob_measurements = np.zeros(n_qubits, dtype=int)
-        for i in range(n_qubits):
-            if alice_bases[i] == bob_bases[i]:
-                # Correct basis: measure correctly with high probability
-                bob_measurements[i] = alice_bits[i] if np.random.random() > 0.05 else 1 - alice_bits[i]
-            else:
-                # Wrong basis: random measurement
-                bob_measurements[i] = np.random.randint(0, 2)
+        # Correct basis: measure correctly with high probability (5% flips);
+        # wrong basis: random measurement
+        correct = alice_bases == bob_bases
+        flips = self._sim_rng.random(n_qubits) < 0.05
+        random_bits = self._sim_rng.integers(0, 2, n_qubits, dtype=np.uint8)
+        bob_measurements = np.where(correct, alice_bits ^ flips.astype(np.uint8), random_bits)
         
         # Step 4: Public basis comparison (sifting)
         matching_indices = self.public_basis_comparison(alice_bases, bob_bases)
@@ -352,10 +398,11 @@ class BB84QuNetSim:
         eve_result = self.eavesdropping_check(alice_sift, bob_sift)
         
         # Prepare final results
-        qber = np.mean(alice_sift != bob_sift) if len(alice_sift) > 0 else 0
+        qber = count_bit_errors(alice_sift, bob_sift) / len(alice_sift) if len(alice_sift) > 0 else 0
         
         results = {
-            'timestamp': self.timestamp.isoformat(),
+            'timestamp': self.timestamp,
+            'duration_ns': time.perf_counter_ns() - self.t0_ns,
             'n_qubits_transmitted': n_qubits,
             'sift_length': len(matching_indices),
             'sift_efficiency': len(matching_indices) / n_qubits if n_qubits > 0 else 0,
@@ -367,13 +414,11 @@ class BB84QuNetSim:
             'protocol_log': self.protocol_log
         }
         
-        logger.info(f"\nProtocol Summary:")
-        logger.info(f"  Transmitted: {n_qubits} qubits")
-        logger.info(f"  Sifted: {len(matching_indices)} bits ({results['sift_efficiency']:.2%})")
-        logger.info(f"  QBER: {qber:.4f}")
-        logger.info(f"  Eavesdropper: {'DETECTED' if eve_result['eavesdropper_detected'] else 'NOT DETECTED'}")
-        logger.info(f"  Final key: {eve_result['final_key_length']} bits")
-        logger.info(f"{'='*70}\n")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("BB84 run: %d qubits, sifted %d (%.2f%%), QBER %.4f, eavesdropper %s, final key %d bits",
+                        n_qubits, len(matching_indices), 100 * results['sift_efficiency'], qber,
+                        'DETECTED' if eve_result['eavesdropper_detected'] else 'NOT DETECTED',
+                        eve_result['final_key_length'])
         
         return results
 
@@ -399,20 +444,23 @@ class NetworkPerformanceAnalysis:
         logger.info(f"\nAnalyzing Network Loss Impact")
         logger.info(f"Loss rates: {loss_rates}, Trials: {trials}\n")
         
+        # One network and protocol instance, reused for every trial
+        network = QuantumNetworkSimulator("TestNetwork", 2)
+        network.add_node(0, "Alice")
+        network.add_node(1, "Bob")
+        protocol = BB84QuNetSim(alice_node=0, bob_node=1, network=network)
+        protocol.timestamp = datetime.now().isoformat()
+        
         for loss_rate in loss_rates:
             key_lengths = []
             qber_values = []
             
+            # Reset the channel for this loss rate (counters back to zero)
+            network.add_quantum_channel(0, 1, loss_rate=loss_rate)
+            
             for trial in range(trials):
-                # Create network
-                network = QuantumNetworkSimulator("TestNetwork", 2)
-                network.add_node(0, "Alice")
-                network.add_node(1, "Bob")
-                network.add_quantum_channel(0, 1, loss_rate=loss_rate)
-                
-                # Run protocol
-                protocol = BB84QuNetSim(alice_node=0, bob_node=1, network=network)
-                protocol.timestamp = datetime.now()
+                # Run protocol with a fresh log (earlier results keep theirs)
+                protocol.protocol_log = []
                 results = protocol.run_protocol(n_qubits)
                 
                 key_lengths.append(results['final_key_length'])
@@ -444,7 +492,7 @@ def main():
     
     # Run BB84 protocol
     protocol = BB84QuNetSim(alice_node=0, bob_node=1, network=network)
-    protocol.timestamp = datetime.now()
+    protocol.timestamp = datetime.now().isoformat()
     results = protocol.run_protocol(n_qubits=1000)
     
     print("\n" + "="*70)
@@ -475,4 +523,8 @@ def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     main()
@@ -44,8 +44,143 @@ import numpy as np
 import json
 import csv
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 
+# np.std(..., mean=...) reuses a precomputed mean (NumPy >= 2.0)
+NUMPY_STD_ACCEPTS_MEAN = np.lib.NumpyVersion(np.__version__) >= '2.0.0'
+
+# Optional C-accelerated reductions (NaN-skipping variants)
+try:
+    import bottleneck as bn
+    BOTTLENECK_AVAILABLE = True
+except ImportError:
+    BOTTLENECK_AVAILABLE = False
+
+# Optional fast JSON encoder with native NumPy support
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional Lanczos eigensolver for the spectrum of large density matrices
+try:
+    from scipy.sparse import issparse
+    from scipy.sparse.linalg import eigsh, ArpackNoConvergence
+    SCIPY_EIGSH_AVAILABLE = True
+except ImportError:
+    SCIPY_EIGSH_AVAILABLE = False
+
+# Sparse density matrices at least this large use truncated Lanczos for the
+# entropy (dense ones always go through LAPACK eigvalsh, which beats ARPACK
+# on a dense matvec at any size these simulations produce)
+LANCZOS_MIN_DIM = 256
+
+# np.bitwise_count (popcount ufunc) is available from NumPy 2.0
+HAS_BITWISE_COUNT = hasattr(np, 'bitwise_count')
+
+# Initial number of eigenvalues requested from Lanczos, doubled until the
+# retained eigenvalues cover LANCZOS_TRACE_COVERAGE of the trace
+LANCZOS_INITIAL_K = 16
+LANCZOS_TRACE_COVERAGE = 0.999
+
+# Relative eigenvalue tolerance for Lanczos; far below what the entropy resolves
+LANCZOS_TOL = 1e-10
+
+# One simulation trial as a flat record, so analyzers reduce over
+# contiguous per-metric columns instead of looking up dict keys per trial.
+# Rates stay float64 so a stored QBER compares against the security
+# threshold exactly as the result dict's value does.
+TRIAL_DTYPE = np.dtype([
+    ('qber', np.float64),
+    ('sift', np.int32),
+    ('final', np.int32),
+    ('rate', np.float64),
+    ('eve_det', np.bool_),
+    ('n_qubits', np.int32),
+    ('eve_err', np.float64),
+])
+
+
+# Generator for simulated key material (bits and bases), seeded once per
+# process from OS entropy and shared by every protocol instance. It is kept
+# apart from the simulation generators so a simulation seed does not fix the
+# key bits; PCG64 is not a CSPRNG, so simulated keys are not for real use.
+_KEY_RNG = np.random.default_rng()
+
+
+def key_generator(key_rng=None):
+    """
+    Generator for key material (bits and bases)
+    
+    Args:
+        key_rng (np.random.Generator): Explicit generator (e.g. for reproducible runs)
+        
+    Returns:
+        np.random.Generator: key_rng, or the shared key generator when None
+    """
+    return key_rng if key_rng is not None else _KEY_RNG
+
+
+def pack_bits(bits):
+    """
+    Pack a 0/1 (or boolean) sequence into uint64 words, 64 bits per word
+    
+    The tail of the last word is zero-padded.
+    """
+    if not isinstance(bits, np.ndarray):
+        bits = np.asarray(bits, dtype=np.uint8)
+    packed = np.packbits(bits)
+    padding = -len(packed) % 8
+    if padding:
+        packed = np.concatenate([packed, np.zeros(padding, dtype=np.uint8)])
+    return packed.view(np.uint64)
+
+
+def popcount(words):
+    """Total number of set bits in an array of unsigned integer words"""
+    words = np.ascontiguousarray(words)
+    if HAS_BITWISE_COUNT:
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(np.count_nonzero(np.unpackbits(words.view(np.uint8))))
+
+
+def count_bit_errors(bits_a, bits_b, mask=None):
+    """
+    Count positions where two 0/1 sequences differ
+    
+    Both are packed 64 bits per uint64 word, so the count is one XOR and
+    popcount per word instead of a comparison per bit. An optional boolean
+    mask restricts the count to the selected positions without gathering
+    them first.
+    
+    Args:
+        bits_a (array_like): First bit sequence
+        bits_b (array_like): Second bit sequence (same length)
+        mask (array_like): Positions to count (None for all)
+        
+    Returns:
+        int: Number of differing positions
+    """
+    diff = pack_bits(bits_a) ^ pack_bits(bits_b)
+    if mask is not None:
+        diff &= pack_bits(mask)
+    return popcount(diff)
+
+
+def _xlog2(x):
+    """
+    Element-wise x * log2(x) with the limit 0 at x <= 0
+    
+    The log only sees positive entries, so there is no epsilon bias, no
+    divide warning and no NaN from slightly negative inputs.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    positive = x > 0
+    return x * np.log2(x, out=np.zeros_like(x), where=positive) * positive
+
 
 class SimulationDataManager:
     """Manage simulation data and file I/O"""
@@ -53,8 +188,14 @@ class SimulationDataManager:
     @staticmethod
     def save_results_json(results, filename):
         """Save results to JSON file"""
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
+        if ORJSON_AVAILABLE:
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(results, default=str,
+                                     option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY |
+                                     orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(filename, 'w') as f:
+                json.dump(results, f, indent=2, default=str)
         print(f"Results saved to {filename}")
     
     @staticmethod
@@ -63,10 +204,22 @@ class SimulationDataManager:
         if not results_list:
             return
         
+        fieldnames = list(results_list[0].keys())
+        keys = results_list[0].keys()
         with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=results_list[0].keys())
-            writer.writeheader()
-            writer.writerows(results_list)
+            if all(r.keys() == keys for r in results_list):
+                # Stable fields: write plain rows, skipping DictWriter's per-row dict handling
+                row = itemgetter(*fieldnames)
+                writer = csv.writer(f)
+                writer.writerow(fieldnames)
+                if len(fieldnames) == 1:
+                    writer.writerows((row(r),) for r in results_list)
+                else:
+                    writer.writerows(map(row, results_list))
+            else:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(results_list)
         print(f"Results saved to {filename}")
     
     @staticmethod
@@ -74,20 +227,139 @@ class SimulationDataManager:
         """Load results from JSON file"""
         with open(filename, 'r') as f:
             return json.load(f)
+    
+    @staticmethod
+    def trial_record(result):
+        """Flatten one simulation result dict into a TRIAL_DTYPE tuple"""
+        return (
+            result.get('qber', 0),
+            result.get('sift_length', result.get('sifted_key_length', 0)),
+            result.get('final_key_length', len(result.get('final_key', []))),
+            result.get('key_rate', 0),
+            result.get('eavesdropper_detected', False),
+            result.get('n_qubits_transmitted', 0),
+            result.get('eve_error_rate', 0),
+        )
+    
+    @staticmethod
+    def results_to_records(results):
+        """
+        Ingest simulation results into a TRIAL_DTYPE structured array
+        
+        Args:
+            results (list or np.ndarray): Result dicts, or records already
+                ingested (returned unchanged)
+            
+        Returns:
+            np.ndarray: One TRIAL_DTYPE record per trial
+        """
+        if isinstance(results, np.ndarray) and results.dtype == TRIAL_DTYPE:
+            return results
+        return np.fromiter((SimulationDataManager.trial_record(r) for r in results),
+                           dtype=TRIAL_DTYPE, count=len(results))
+
+
+class StatisticsUtils:
+    """Shared statistical reductions for simulation results"""
+    
+    @staticmethod
+    def mean_std(values, axis=None):
+        """
+        Compute mean and standard deviation together
+        
+        Uses bottleneck's C reductions when installed; otherwise the mean is
+        computed once and handed to np.nanstd, so the data is not averaged a
+        second time inside the std reduction. Both paths skip NaN values.
+        
+        Reductions always accumulate in float64, whatever the input dtype:
+        bottleneck sums sequentially in the input dtype, which for float32
+        drifts by several percent over millions of values.
+        
+        Args:
+            values (array_like): Sample values
+            axis (int): Axis to reduce over (None for all values)
+            
+        Returns:
+            tuple: (mean, std), scalars or arrays depending on axis
+        """
+        values = np.asarray(values)
+        if BOTTLENECK_AVAILABLE:
+            values = values.astype(np.float64, copy=False)
+            return bn.nanmean(values, axis=axis), bn.nanstd(values, axis=axis)
+        
+        mean = np.nanmean(values, axis=axis, dtype=np.float64, keepdims=True)
+        if NUMPY_STD_ACCEPTS_MEAN:
+            std = np.nanstd(values, axis=axis, dtype=np.float64, mean=mean)
+        else:
+            std = np.sqrt(np.nanmean(np.square(values - mean), axis=axis))
+        return np.squeeze(mean, axis=axis)[()], std
+    
+    @staticmethod
+    def min_max(values, axis=None):
+        """
+        Compute minimum and maximum together
+        
+        Extremes are exact in any dtype, so values are reduced as stored.
+        Like mean_std, NaN values are skipped on both paths.
+        
+        Args:
+            values (array_like): Sample values
+            axis (int): Axis to reduce over (None for all values)
+            
+        Returns:
+            tuple: (min, max), scalars or arrays depending on axis
+        """
+        values = np.asarray(values)
+        if BOTTLENECK_AVAILABLE:
+            return bn.nanmin(values, axis=axis), bn.nanmax(values, axis=axis)
+        return np.nanmin(values, axis=axis), np.nanmax(values, axis=axis)
 
 
 class QuantumMetrics:
     """Calculate quantum information metrics"""
     
+    @staticmethod
+    def _density_spectrum(density_matrix):
+        """
+        Eigenvalues of a density matrix that carry its entropy
+        
+        Dense matrices use a full eigvalsh. Large scipy.sparse matrices are
+        not densified: mixed states of interest are low-rank, so only the
+        largest eigenvalues are found by Lanczos, with k doubled until they
+        hold LANCZOS_TRACE_COVERAGE of the trace. If that needs a large part
+        of the spectrum anyway, fall back to a dense eigvalsh.
+        """
+        if not (SCIPY_EIGSH_AVAILABLE and issparse(density_matrix)):
+            return np.linalg.eigvalsh(density_matrix)
+        
+        n = density_matrix.shape[0]
+        if n < LANCZOS_MIN_DIM:
+            return np.linalg.eigvalsh(density_matrix.toarray())
+        
+        trace = np.real(density_matrix.diagonal().sum())
+        k = LANCZOS_INITIAL_K
+        while k <= n // 4:
+            try:
+                eigenvalues = eigsh(density_matrix, k=k, which='LA',
+                                    tol=LANCZOS_TOL, return_eigenvectors=False)
+            except ArpackNoConvergence:
+                break
+            if np.sum(np.clip(eigenvalues, 0, None)) >= LANCZOS_TRACE_COVERAGE * trace:
+                return eigenvalues
+            k *= 2
+        return np.linalg.eigvalsh(density_matrix.toarray())
+    
     @staticmethod
     def calculate_von_neumann_entropy(density_matrix):
         """
         Calculate von Neumann entropy of density matrix
         S(ρ) = -Tr(ρ log₂(ρ))
+        
+        Eigenvalues are clipped to [0, 1], so small negative ones from the
+        eigensolver contribute 0 rather than NaN.
         """
-        eigenvalues = np.linalg.eigvalsh(density_matrix)
-        eigenvalues = eigenvalues[eigenvalues > 1e-10]  # Remove numerical zeros
-        entropy = -np.sum(eigenvalues * np.log2(eigenvalues + 1e-10))
+        eigenvalues = QuantumMetrics._density_spectrum(density_matrix)
+        entropy = -np.sum(_xlog2(np.clip(eigenvalues, 0, 1)))
         return entropy
     
     @staticmethod
@@ -104,43 +376,90 @@ class QuantumMetrics:
         """
         Calculate classical mutual information
         I(X;Y) = Σ p(x,y) log(p(x,y)/(p(x)p(y)))
+        
+        joint_prob is either a (len(marginal1), len(marginal2)) table or the
+        flat layout with x varying fastest (index y * len(marginal1) + x).
         """
-        mi = 0
-        for i, p_joint in enumerate(joint_prob):
-            if p_joint > 0:
-                for j in range(len(marginal1)):
-                    if i % len(marginal1) == j and marginal1[j] > 0 and marginal2[i // len(marginal1)] > 0:
-                        ratio = p_joint / (marginal1[j] * marginal2[i // len(marginal1)])
-                        mi += p_joint * np.log2(ratio)
-        return mi
+        m1 = np.asarray(marginal1, dtype=np.float64)
+        m2 = np.asarray(marginal2, dtype=np.float64)
+        p = np.asarray(joint_prob, dtype=np.float64)
+        if p.ndim == 1:
+            p = p.reshape(len(m2), len(m1)).T
+        
+        independent = np.outer(m1, m2)
+        mask = (p > 0) & (independent > 0)
+        ratio = np.divide(p, independent, out=np.ones_like(p), where=mask)
+        log_ratio = np.log2(ratio, out=np.zeros_like(p), where=mask)
+        return float(np.sum(p * log_ratio))
 
 
 class SecurityAnalyzer:
     """Analyze security of QKD protocols"""
     
+    @staticmethod
+    def _binary_entropy(q):
+        """
+        Element-wise binary entropy H(q) in bits, with H(0) = H(1) = 0
+        exactly (no epsilon inside the logs)
+        """
+        q = np.asarray(q, dtype=np.float64)
+        return -_xlog2(q) - _xlog2(1 - q)
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _qber_entropy(qber):
+        """
+        Binary entropy H(QBER), memoized since sweeps and repeated analyses
+        keep asking for the same QBER values (keyed on the exact float, so a
+        cached value is never reused for a different QBER)
+        """
+        return float(SecurityAnalyzer._binary_entropy(qber))
+    
+    @staticmethod
+    def _entropy(qber):
+        """H(QBER) for a scalar (memoized) or an array of QBERs (vectorized)"""
+        if np.ndim(qber) == 0:
+            return SecurityAnalyzer._qber_entropy(float(qber))
+        return SecurityAnalyzer._binary_entropy(qber)
+    
+    @staticmethod
+    def _clip_rate(rate):
+        """Clip rates at 0; scalars stay Python floats"""
+        rate = np.maximum(0, rate)
+        return float(rate) if np.ndim(rate) == 0 else rate
+    
     @staticmethod
     def estimate_eavesdropper_rate(qber, depolarization_model=True):
         """
-        Estimate eavesdropper information from QBER
+        Estimate eavesdropper information from QBER (scalar or array)
         
         For BB84 with depolarizing channel:
         I_Eve ≈ 1 - H(QBER)
         where H is binary entropy
         """
-        h_qber = -qber * np.log2(qber + 1e-10) - (1 - qber) * np.log2(1 - qber + 1e-10)
-        i_eve = 1 - h_qber
-        return max(0, i_eve)
+        return SecurityAnalyzer._clip_rate(1 - SecurityAnalyzer._entropy(qber))
     
     @staticmethod
     def calculate_secret_key_rate(sift_rate, qber, n_steps=10):
         """
         Calculate final secret key rate after error correction and privacy amplification
         
-        R_secret = sift_rate * (1 - 2H(QBER))
+        R_secret = sift_rate * (1 - 2H(QBER)), for scalar or array QBERs
         """
-        h_qber = -qber * np.log2(qber + 1e-10) - (1 - qber) * np.log2(1 - qber + 1e-10)
-        secret_fraction = 1 - 2 * h_qber
-        return max(0, sift_rate * secret_fraction)
+        h_qber = SecurityAnalyzer._entropy(qber)
+        return SecurityAnalyzer._clip_rate(sift_rate * (1 - 2 * h_qber))
+    
+    @staticmethod
+    def security_rates(sift_rate, qber):
+        """
+        Eavesdropper information and secret key rate from one H(QBER) evaluation
+        
+        Returns:
+            tuple: (I_Eve, R_secret), scalars or arrays matching qber
+        """
+        h_qber = SecurityAnalyzer._entropy(qber)
+        return (SecurityAnalyzer._clip_rate(1 - h_qber),
+                SecurityAnalyzer._clip_rate(sift_rate * (1 - 2 * h_qber)))
     
     @staticmethod
     def check_security_threshold(qber, threshold=0.11):
@@ -154,6 +473,8 @@ class SecurityAnalyzer:
 class ProtocolValidator:
     """Validate QKD protocol implementations"""
     
+    REQUIRED_BB84_FIELDS = ('n_qubits_transmitted', 'sift_length', 'qber', 'is_secure')
+    
     @staticmethod
     def validate_bb84_simulation(results):
         """Validate BB84 simulation results"""
@@ -161,7 +482,7 @@ class ProtocolValidator:
         warnings = []
         
         # Check for required fields
-        required_fields = ['n_qubits_transmitted', 'sift_length', 'qber', 'is_secure']
+        required_fields = ProtocolValidator.REQUIRED_BB84_FIELDS
         for field in required_fields:
             if field not in results:
                 errors.append(f"Missing required field: {field}")
@@ -177,23 +498,61 @@ class ProtocolValidator:
                 errors.append(f"QBER out of range: {results['qber']}")
         
         return {'valid': len(errors) == 0, 'errors': errors, 'warnings': warnings}
-
-
-class NetworkSimulationUtils:
-    """Utilities for quantum network simulations"""
     
     @staticmethod
-    def calculate_network_overhead(n_nodes, protocol='BB84'):
+    def validate_bb84_batch(results):
         """
-        Calculate communication overhead for network protocol
+        Validate many BB84 simulation results at once
+        
+        Same checks as validate_bb84_simulation, run as array comparisons
+        over TRIAL_DTYPE columns instead of once per result. Field presence
+        is only known for result dicts; TRIAL_DTYPE records count as
+        complete, and those without a transmitted-qubit count skip the sift
+        check.
         
         Args:
-            n_nodes (int): Number of nodes in network
-            protocol (str): Protocol name
+            results (list or np.ndarray): Result dicts, or TRIAL_DTYPE records
             
         Returns:
-            dict: Overhead metrics
+            dict: Validity, failure counts and indices of failing results
         """
+        records = SimulationDataManager.results_to_records(results)
+        
+        # One column per required field, True where a result lacks it
+        required_fields = ProtocolValidator.REQUIRED_BB84_FIELDS
+        missing = np.zeros((len(records), len(required_fields)), dtype=bool)
+        if records is not results:
+            for i, r in enumerate(results):
+                missing[i] = [field not in r for field in required_fields]
+        missing_fields = missing.any(axis=1)
+        has_sift = ~(missing[:, 0] | missing[:, 1])
+        
+        qber = records['qber'].astype(np.float64, copy=False)
+        bad_qber = (qber < 0) | (qber > 1)
+        
+        n_qubits = records['n_qubits']
+        sift_efficiency = np.divide(records['sift'], n_qubits, dtype=np.float64,
+                                    out=np.full(len(records), np.nan),
+                                    where=has_sift & (n_qubits > 0))
+        bad_sift = (sift_efficiency < 0.2) | (sift_efficiency > 0.3)
+        
+        return {
+            'valid': not (bad_qber | missing_fields).any(),
+            'n_missing_fields': int(np.count_nonzero(missing_fields)),
+            'n_bad_qber': int(np.count_nonzero(bad_qber)),
+            'n_bad_sift_efficiency': int(np.count_nonzero(bad_sift)),
+            'missing_field_indices': np.flatnonzero(missing_fields),
+            'bad_qber_indices': np.flatnonzero(bad_qber),
+            'bad_sift_indices': np.flatnonzero(bad_sift)
+        }
+
+
+class NetworkSimulationUtils:
+    """Utilities for quantum network simulations"""
+    
+    @staticmethod
+    def _network_overhead_formula(n_nodes, protocol):
+        """Body of calculate_network_overhead, for scalar or array node counts"""
         if protocol == 'BB84':
             # BB84 requires: basis announcement + sifting comparison
             # Overhead ≈ 2 * message transmissions
@@ -211,19 +570,33 @@ class NetworkSimulationUtils:
         
         return None
     
+    # Memoized scalar path (callers get a copy of the cached dict)
+    _network_overhead = staticmethod(lru_cache(maxsize=1024)(_network_overhead_formula.__func__))
+    
     @staticmethod
-    def estimate_quantum_channel_capacity(loss_rate, error_rate, bandwidth_ghz=100):
+    def calculate_network_overhead(n_nodes, protocol='BB84'):
         """
-        Estimate quantum channel capacity considering losses
+        Calculate communication overhead for network protocol
+        
+        Scalar node counts are memoized for parameter sweeps; each call
+        returns its own dict, so callers cannot modify the cached entry.
+        Arrays of node counts are evaluated directly.
         
         Args:
-            loss_rate (float): Probability of qubit loss (0.0-1.0)
-            error_rate (float): Quantum error rate (0.0-1.0)
-            bandwidth_ghz (float): Channel bandwidth in GHz
+            n_nodes (int or array_like): Number of nodes in network
+            protocol (str): Protocol name
             
         Returns:
-            dict: Capacity estimates
+            dict: Overhead metrics (None for unknown protocols)
         """
+        if np.ndim(n_nodes) != 0:
+            return NetworkSimulationUtils._network_overhead_formula(n_nodes, protocol)
+        overhead = NetworkSimulationUtils._network_overhead(n_nodes, protocol)
+        return dict(overhead) if overhead is not None else None
+    
+    @staticmethod
+    def _channel_capacity_formula(loss_rate, error_rate, bandwidth_ghz):
+        """Body of estimate_quantum_channel_capacity, for scalar or array inputs"""
         transmission_prob = (1 - loss_rate) * (1 - error_rate)
         effective_bandwidth = bandwidth_ghz * transmission_prob
         
@@ -233,7 +606,31 @@ class NetworkSimulationUtils:
             'loss_rate': loss_rate,
             'error_rate': error_rate
         }
-
+    
+    # Memoized scalar path (callers get a copy of the cached dict)
+    _channel_capacity = staticmethod(lru_cache(maxsize=1024)(_channel_capacity_formula.__func__))
+    
+    @staticmethod
+    def estimate_quantum_channel_capacity(loss_rate, error_rate, bandwidth_ghz=100):
+        """
+        Estimate quantum channel capacity considering losses
+        
+        Scalar inputs are memoized for parameter sweeps; each call returns
+        its own dict, so callers cannot modify the cached entry. Rates driven
+        by sliders should be rounded (e.g. to 6 decimals) so repeats hit the
+        cache. Array inputs are evaluated directly, element-wise.
+        
+        Args:
+            loss_rate (float or array_like): Probability of qubit loss (0.0-1.0)
+            error_rate (float or array_like): Quantum error rate (0.0-1.0)
+            bandwidth_ghz (float or array_like): Channel bandwidth in GHz
+            
+        Returns:
+            dict: Capacity estimates
+        """
+        if np.ndim(loss_rate) or np.ndim(error_rate) or np.ndim(bandwidth_ghz):
+            return NetworkSimulationUtils._channel_capacity_formula(loss_rate, error_rate, bandwidth_ghz)
+        return dict(NetworkSimulationUtils._channel_capacity(loss_rate, error_rate, bandwidth_ghz))
 
 if __name__ == "__main__":
     print("Quantum Communication Utilities Module")